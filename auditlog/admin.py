@@ -1,5 +1,5 @@
 from django.contrib import admin
-from auditlog.models import PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
+from auditlog.models import PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory, OrderHistoryLine, DailySalesRollup, DailyPurchaseRollup, OutboxEvent
 
 @admin.register(PurchaseOrderHistory)
 class PurchaseOrderHistoryAdmin(admin.ModelAdmin):
@@ -21,3 +21,28 @@ class WarehouseStockHistoryAdmin(admin.ModelAdmin):
     list_filter = ('action', 'timestamp')
     search_fields = ('warehouse_name', 'products')
     ordering = ('-timestamp',)
+
+@admin.register(OrderHistoryLine)
+class OrderHistoryLineAdmin(admin.ModelAdmin):
+    list_display = ('order_type', 'order_id', 'product_name', 'quantity', 'unit_price', 'status', 'timestamp')
+    list_filter = ('order_type', 'status')
+    search_fields = ('product_name',)
+    ordering = ('-timestamp',)
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'dimension', 'key_id', 'units', 'revenue', 'order_count')
+    list_filter = ('dimension', 'day')
+    ordering = ('-day', 'dimension', 'key_id')
+
+@admin.register(DailyPurchaseRollup)
+class DailyPurchaseRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'key_id', 'units', 'cost', 'order_count')
+    list_filter = ('day',)
+    ordering = ('-day', 'key_id')
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'created_at', 'processed_at', 'attempts')
+    list_filter = ('topic', 'processed_at')
+    ordering = ('-id',)
@@ -1,6 +1,6 @@
 # serializers.py
 from rest_framework import serializers
-from auditlog.models import PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
+from auditlog.models import DailyPurchaseRollup, DailySalesRollup, PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
 
 class PurchaseOrderHistorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,3 +16,13 @@ class WarehouseStockHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = WarehouseStockHistory
         fields = '__all__'
+
+class DailySalesRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailySalesRollup
+        fields = ['day', 'key_id', 'units', 'revenue', 'order_count']
+
+class DailyPurchaseRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyPurchaseRollup
+        fields = ['day', 'key_id', 'units', 'cost', 'order_count']
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from .views import (
     PurchaseOrderHistoryList,
     PurchaseOrderHistoryDetail,
@@ -6,6 +6,11 @@ from .views import (
     SalesOrderHistoryDetail,
     WarehouseStockHistoryList,
     WarehouseStockHistoryDetail,
+    DailySalesRollupList,
+    DailyPurchaseRollupList,
+    PurchaseOrderHistoryExport,
+    SalesOrderHistoryExport,
+    WarehouseStockHistoryExport,
 )
 
 urlpatterns = [
@@ -15,4 +20,11 @@ urlpatterns = [
     path('sales-history/<int:pk>/', SalesOrderHistoryDetail.as_view(), name='sales-order-history-detail'),
     path('stock-history/', WarehouseStockHistoryList.as_view(), name='warehouse-stock-history-list'),
     path('stock-history/<int:pk>/', WarehouseStockHistoryDetail.as_view(), name='warehouse-stock-history-detail'),
+    re_path(r'^purchase-history/export\.(?P<export_format>ndjson|csv)$', PurchaseOrderHistoryExport.as_view(), name='purchase-order-history-export'),
+    re_path(r'^sales-history/export\.(?P<export_format>ndjson|csv)$', SalesOrderHistoryExport.as_view(), name='sales-order-history-export'),
+    re_path(r'^stock-history/export\.(?P<export_format>ndjson|csv)$', WarehouseStockHistoryExport.as_view(), name='warehouse-stock-history-export'),
+    path('rollups/products/', DailySalesRollupList.as_view(dimension='product'), name='product-sales-rollup-list'),
+    path('rollups/warehouses/', DailySalesRollupList.as_view(dimension='warehouse'), name='warehouse-sales-rollup-list'),
+    path('rollups/customers/', DailySalesRollupList.as_view(dimension='customer'), name='customer-sales-rollup-list'),
+    path('rollups/purchases/products/', DailyPurchaseRollupList.as_view(), name='product-purchase-rollup-list'),
 ]
\ No newline at end of file
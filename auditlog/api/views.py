@@ -1,26 +1,50 @@
 # views.py
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from auditlog.filters import (
+    DailyPurchaseRollupFilter,
+    DailySalesRollupFilter,
     PurchaseOrderHistoryFilter,
     SalesOrderHistoryFilter,
     WarehouseStockHistoryFilter,
 )
 from rest_framework import generics
 from rest_framework import permissions
-from auditlog.models import PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
+from auditlog.models import DailyPurchaseRollup, DailySalesRollup, PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
 from auditlog.api.serializers import (
+    DailyPurchaseRollupSerializer,
+    DailySalesRollupSerializer,
     PurchaseOrderHistorySerializer,
     SalesOrderHistorySerializer,
     WarehouseStockHistorySerializer,
 )
 from orders.permissions import IsStoreAdminOrStaff
 from auditlog.permissions import IsCustomerOrAdmin
+from auditlog.pagination import HistoryCursorPagination, HistoryPageNumberPagination
 
-class PurchaseOrderHistoryList(generics.ListAPIView):
-    queryset = PurchaseOrderHistory.objects.all()
+
+class HistoryListView(generics.ListAPIView):
+    """Cursor pagination over (timestamp, id); passing `page` gives numbered pages instead."""
+    pagination_class = HistoryCursorPagination
+    filter_backends = [DjangoFilterBackend]
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if 'page' in self.request.query_params:
+                self._paginator = HistoryPageNumberPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+class PurchaseOrderHistoryList(HistoryListView):
+    queryset = PurchaseOrderHistory.objects.order_by('-timestamp', '-id')
     serializer_class = PurchaseOrderHistorySerializer
     permission_classes = [permissions.IsAuthenticated, IsStoreAdminOrStaff]
-    filter_backends = [DjangoFilterBackend]
     filterset_class = PurchaseOrderHistoryFilter
 
 class PurchaseOrderHistoryDetail(generics.RetrieveAPIView):
@@ -28,11 +52,10 @@ class PurchaseOrderHistoryDetail(generics.RetrieveAPIView):
     serializer_class = PurchaseOrderHistorySerializer
     permission_classes = [permissions.IsAuthenticated, IsStoreAdminOrStaff]
 
-class SalesOrderHistoryList(generics.ListAPIView):
-    queryset = SalesOrderHistory.objects.all()
+class SalesOrderHistoryList(HistoryListView):
+    queryset = SalesOrderHistory.objects.order_by('-timestamp', '-id')
     serializer_class = SalesOrderHistorySerializer
     permission_classes = [permissions.IsAuthenticated, IsCustomerOrAdmin]
-    filter_backends = [DjangoFilterBackend]
     filterset_class = SalesOrderHistoryFilter
 
 
@@ -41,14 +64,92 @@ class SalesOrderHistoryDetail(generics.RetrieveAPIView):
     serializer_class = SalesOrderHistorySerializer
     permission_classes = [permissions.IsAuthenticated, IsCustomerOrAdmin]
 
-class WarehouseStockHistoryList(generics.ListAPIView):
-    queryset = WarehouseStockHistory.objects.all()
+class WarehouseStockHistoryList(HistoryListView):
+    queryset = WarehouseStockHistory.objects.order_by('-timestamp', '-id')
     serializer_class = WarehouseStockHistorySerializer
     permission_classes = [permissions.IsAuthenticated, IsStoreAdminOrStaff]
-    filter_backends = [DjangoFilterBackend]
     filterset_class = WarehouseStockHistoryFilter
 
 class WarehouseStockHistoryDetail(generics.RetrieveAPIView):
     queryset = WarehouseStockHistory.objects.all()
     serializer_class = WarehouseStockHistorySerializer
     permission_classes = [permissions.IsAuthenticated, IsStoreAdminOrStaff]
+
+class DailySalesRollupList(generics.ListAPIView):
+    """
+    Daily completed-sales totals for one dimension (product, warehouse or customer), read
+    from the precomputed rollups. Filter with day_after/day_before and key_id.
+    """
+    dimension = None
+    serializer_class = DailySalesRollupSerializer
+    permission_classes = [permissions.IsAuthenticated, IsStoreAdminOrStaff]
+    pagination_class = HistoryPageNumberPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = DailySalesRollupFilter
+
+    def get_queryset(self):
+        return DailySalesRollup.objects.filter(dimension=self.dimension).order_by('-day', 'key_id')
+
+class DailyPurchaseRollupList(DailySalesRollupList):
+    """Daily completed-purchase units, cost and order count per product."""
+    serializer_class = DailyPurchaseRollupSerializer
+    filterset_class = DailyPurchaseRollupFilter
+
+    def get_queryset(self):
+        return DailyPurchaseRollup.objects.order_by('-day', 'key_id')
+
+
+class _Echo:
+    """A file-like object whose write() hands the line back, so csv.writer can feed a stream."""
+    def write(self, value):
+        return value
+
+
+class HistoryExportView(generics.GenericAPIView):
+    """
+    Stream every row matching the list filters as NDJSON or CSV, oldest first.
+
+    Rows are read through a server-side cursor in chunks and written out as they
+    arrive, so memory use does not depend on how many rows are exported.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsStoreAdminOrStaff]
+    filter_backends = [DjangoFilterBackend]
+    chunk_size = 2000
+
+    def get(self, request, export_format, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).order_by('timestamp', 'id')
+        fields = [field.attname for field in queryset.model._meta.concrete_fields]
+        rows = queryset.values(*fields).iterator(chunk_size=self.chunk_size)
+
+        if export_format == 'csv':
+            content, content_type = self._csv(fields, rows), 'text/csv'
+        else:
+            content, content_type = self._ndjson(rows), 'application/x-ndjson'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{queryset.model._meta.model_name}.{export_format}"'
+        return response
+
+    def _ndjson(self, rows):
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+    def _csv(self, fields, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([
+                json.dumps(value, cls=DjangoJSONEncoder) if isinstance(value, (dict, list)) else value
+                for value in row.values()
+            ])
+
+class PurchaseOrderHistoryExport(HistoryExportView):
+    queryset = PurchaseOrderHistory.objects.all()
+    filterset_class = PurchaseOrderHistoryFilter
+
+class SalesOrderHistoryExport(HistoryExportView):
+    queryset = SalesOrderHistory.objects.all()
+    filterset_class = SalesOrderHistoryFilter
+
+class WarehouseStockHistoryExport(HistoryExportView):
+    queryset = WarehouseStockHistory.objects.all()
+    filterset_class = WarehouseStockHistoryFilter
@@ -0,0 +1,119 @@
+"""
+Collects audit history rows and writes them with one bulk_create per model.
+
+Rows recorded inside a transaction are flushed from transaction.on_commit (and
+dropped if it rolls back); rows recorded outside one during a request are flushed
+by AuditBufferMiddleware when the response is ready. Anything else is written
+straight away. With AUDITLOG_FLUSH_MODE = "thread" the flush itself runs on a
+background thread instead of the request thread.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class AuditBatch:
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, model, rows):
+        self.rows.setdefault(model, []).extend(rows)
+
+    def flush(self):
+        rows, self.rows = self.rows, {}
+        if not rows:
+            return
+        if getattr(settings, "AUDITLOG_FLUSH_MODE", "commit") == "thread":
+            _worker().put(rows)
+        else:
+            write_rows(rows)
+
+
+def write_rows(rows):
+    for model, model_rows in rows.items():
+        model.objects.bulk_create([model(**row) for row in model_rows], batch_size=1000)
+
+
+def _transaction_batch():
+    """
+    The batch of the current savepoint (or of the transaction, outside savepoints).
+
+    Its flush is registered with on_commit from that savepoint, so Django discards
+    it, rows and all, if the savepoint rolls back; rows of enclosing savepoints live
+    in their own batches and are unaffected. The flush is registered again on every
+    add (the first run writes everything) so it also runs after callbacks that were
+    registered in between.
+    """
+    savepoints = set(connection.savepoint_ids)
+    batch = next(
+        (callback.__self__ for sids, callback, _ in connection.run_on_commit
+         if sids == savepoints and isinstance(getattr(callback, "__self__", None), AuditBatch)),
+        None,
+    ) or AuditBatch()
+    transaction.on_commit(batch.flush)
+    return batch
+
+
+def add(model, rows):
+    if connection.in_atomic_block:
+        _transaction_batch().add(model, rows)
+    elif getattr(_local, "request_batch", None) is not None:
+        _local.request_batch.add(model, rows)
+    else:
+        write_rows({model: rows})
+
+
+class AuditBufferMiddleware:
+    """Batch the audit rows a request records outside transactions into one flush per model."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.request_batch = AuditBatch()
+        try:
+            response = self.get_response(request)
+        finally:
+            batch, _local.request_batch = _local.request_batch, None
+            batch.flush()
+        return response
+
+
+class _Worker(threading.Thread):
+    def __init__(self):
+        super().__init__(name="auditlog-flush", daemon=True)
+        self.queue = queue.Queue()
+
+    def put(self, rows):
+        self.queue.put(rows)
+
+    def run(self):
+        while True:
+            rows = self.queue.get()
+            try:
+                write_rows(rows)
+            except Exception:
+                logger.exception("Failed to write audit history batch")
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+_worker_instance = None
+_worker_lock = threading.Lock()
+
+
+def _worker():
+    global _worker_instance
+    with _worker_lock:
+        if _worker_instance is None:
+            _worker_instance = _Worker()
+            _worker_instance.start()
+    return _worker_instance
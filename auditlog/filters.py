@@ -1,6 +1,11 @@
 # filters.py
+from datetime import datetime
+
+from django import forms
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
 from django_filters import rest_framework as filters
-from auditlog.models import PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
+from auditlog.models import DailyPurchaseRollup, DailySalesRollup, OrderHistoryLine, PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
 STATUS_CHOICES = [
     ('pending', 'Pending'),
     ('approved', 'Approved'),
@@ -15,37 +20,115 @@ ACTION_CHOICES = [
     ('order_cancelled', 'Order Cancelled'),
 ]
 
-class PurchaseOrderHistoryFilter(filters.FilterSet):
+def _calendar_range(year, month=None, day=None):
+    """[start, end) of a year, month or day in the current time zone."""
+    start = datetime(year, 1 if month is None else month, 1 if day is None else day)
+    if day is not None:
+        end = datetime.fromordinal(start.toordinal() + 1)
+    elif month is not None:
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+    else:
+        end = datetime(year + 1, 1, 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+class IntegerFilter(filters.NumberFilter):
+    """A NumberFilter that rejects fractions like month=3.5 instead of truncating them."""
+    field_class = forms.IntegerField
+
+
+class TimestampFilterSet(filters.FilterSet):
+    """
+    `timestamp_after`/`timestamp_before` filter on the indexed timestamp column. The
+    older `year`/`month`/`day` parameters are turned into the same kind of range, so
+    they can use the index too instead of comparing EXTRACT(...) on every row.
+    """
+    timestamp = filters.IsoDateTimeFromToRangeFilter()
+    year = IntegerFilter(method='filter_calendar')
+    month = IntegerFilter(method='filter_calendar')
+    day = IntegerFilter(method='filter_calendar')
+
+    def filter_calendar(self, queryset, name, value):
+        return queryset  # Applied together in filter_queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        year, month, day = (self.form.cleaned_data.get(part) for part in ('year', 'month', 'day'))
+        if year is None:
+            # No year to anchor a range; match the part in any year as before
+            if month is not None:
+                queryset = queryset.filter(timestamp__month=month)
+            if day is not None:
+                queryset = queryset.filter(timestamp__day=day)
+            return queryset
+        if month is None and day is not None:
+            queryset = queryset.filter(timestamp__day=day)
+            day = None
+        try:
+            start, end = _calendar_range(year, month, day)
+        except (ValueError, OverflowError):
+            return queryset.none()  # No such date
+        return queryset.filter(timestamp__gte=start, timestamp__lt=end)
+
+
+class OrderHistoryLineFilterSet(TimestampFilterSet):
+    """
+    `product`, `supplier` and `category` match entries with an OrderHistoryLine for
+    such a product, through the (product, timestamp) and (order, timestamp) indexes.
+    """
+    order_type = None  # 'purchase' or 'sales'
+    product = filters.NumberFilter(method='filter_lines')
+    supplier = filters.NumberFilter(method='filter_lines')
+    category = filters.NumberFilter(method='filter_lines')
+
+    def filter_lines(self, queryset, name, value):
+        lookup = {'product': 'product_id', 'supplier': 'product__supplier_id', 'category': 'product__category_id'}[name]
+        lines = OrderHistoryLine.objects.filter(
+            order_type=self.order_type,
+            order_id=OuterRef('order_id'),
+            timestamp=OuterRef('timestamp'),
+            **{lookup: value},
+        )
+        return queryset.filter(Exists(lines))
+
+
+class PurchaseOrderHistoryFilter(OrderHistoryLineFilterSet):
+    order_type = 'purchase'
     created_by = filters.CharFilter(field_name='created_by', lookup_expr='icontains')
     status = filters.ChoiceFilter(choices=STATUS_CHOICES)
     action = filters.ChoiceFilter(choices=ACTION_CHOICES)
-    year = filters.NumberFilter(field_name='timestamp__year', lookup_expr='exact')
-    month = filters.NumberFilter(field_name='timestamp__month')
-    day = filters.NumberFilter(field_name='timestamp__day')
 
     class Meta:
         model = PurchaseOrderHistory
-        fields = ['created_by', 'status', 'action', 'year', 'month', 'day']
+        fields = ['created_by', 'status', 'action', 'timestamp', 'year', 'month', 'day', 'product', 'supplier', 'category']
 
-class SalesOrderHistoryFilter(filters.FilterSet):
+class SalesOrderHistoryFilter(OrderHistoryLineFilterSet):
+    order_type = 'sales'
     customer_name = filters.CharFilter(field_name='customer_name', lookup_expr='icontains')
     status = filters.ChoiceFilter(choices=STATUS_CHOICES)
     action = filters.ChoiceFilter(choices=ACTION_CHOICES)
-    year = filters.NumberFilter(field_name='timestamp__year')
-    month = filters.NumberFilter(field_name='timestamp__month')
-    day = filters.NumberFilter(field_name='timestamp__day')
 
     class Meta:
         model = SalesOrderHistory
-        fields = ['customer_name', 'status', 'action' , 'year', 'month', 'day']
+        fields = ['customer_name', 'status', 'action' , 'timestamp', 'year', 'month', 'day', 'product', 'supplier', 'category']
 
-class WarehouseStockHistoryFilter(filters.FilterSet):
+class WarehouseStockHistoryFilter(TimestampFilterSet):
     warehouse_name = filters.CharFilter(field_name='warehouse_name', lookup_expr='icontains')
     action = filters.CharFilter(field_name='action', lookup_expr='icontains')
-    year = filters.NumberFilter(field_name='timestamp__year')
-    month = filters.NumberFilter(field_name='timestamp__month')
-    day = filters.NumberFilter(field_name='timestamp__day')
 
     class Meta:
         model = WarehouseStockHistory
-        fields = ['warehouse_name', 'action' , 'year', 'month', 'day']
+        fields = ['warehouse_name', 'action' , 'timestamp', 'year', 'month', 'day']
+
+class DailySalesRollupFilter(filters.FilterSet):
+    day = filters.DateFromToRangeFilter()
+    key_id = filters.NumberFilter()
+
+    class Meta:
+        model = DailySalesRollup
+        fields = ['day', 'key_id']
+
+class DailyPurchaseRollupFilter(DailySalesRollupFilter):
+    class Meta:
+        model = DailyPurchaseRollup
+        fields = ['day', 'key_id']
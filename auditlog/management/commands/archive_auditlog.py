@@ -0,0 +1,54 @@
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from auditlog.models import PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
+from auditlog.partitions import add_months, archive_month, ensure_partitions, month_start
+
+HISTORY_MODELS = [PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move audit history older than the retention window into gzip-compressed JSON lines files, "
+        "one per table and month, then drop it. Also creates the upcoming month partitions on Postgres."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-months", type=int, default=getattr(settings, "AUDITLOG_RETENTION_MONTHS", 12),
+            help="Whole months of history to keep besides the current one (default AUDITLOG_RETENTION_MONTHS).",
+        )
+        parser.add_argument(
+            "--output-dir", default=getattr(settings, "AUDITLOG_ARCHIVE_DIR", settings.BASE_DIR / "archive"),
+            help="Directory for the archive files (default AUDITLOG_ARCHIVE_DIR).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows fetched per round trip (default 2000).")
+        parser.add_argument("--months-ahead", type=int, default=3, help="Future month partitions to create (default 3).")
+        parser.add_argument("--dry-run", action="store_true", help="List the months that would be archived and stop.")
+
+    def handle(self, *args, **options):
+        now = datetime.now(dt_timezone.utc)
+        if not options["dry_run"]:
+            ensure_partitions(options["months_ahead"], now=now)
+
+        cutoff = add_months(month_start(now), -options["retention_months"])
+        output_dir = Path(options["output_dir"])
+        if not options["dry_run"]:
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+        archived = 0
+        for model in HISTORY_MODELS:
+            months = list(model.objects.filter(timestamp__lt=cutoff).datetimes("timestamp", "month", tzinfo=dt_timezone.utc))
+            for month in months:
+                label = f"{model._meta.db_table} {month:%Y-%m}"
+                if options["dry_run"]:
+                    self.stdout.write(f"Would archive {label}")
+                    continue
+                count = archive_month(model, month, output_dir, options["chunk_size"])
+                archived += count
+                self.stdout.write(f"Archived {count} rows of {label}")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} rows older than {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from auditlog.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales and purchase rollups for the days touched since the last run. Safe to re-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Rebuild every day from this ISO date instead of only the touched ones.")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = parse_date(options["since"])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError(f"Invalid date '{options['since']}'.")
+
+        days = refresh_rollups(since=since)
+        if days:
+            self.stdout.write(f"Rebuilt {len(days)} days: {days[0]} to {days[-1]}.")
+        self.stdout.write(self.style.SUCCESS(f"Rollups are up to date ({len(days)} days refreshed)."))
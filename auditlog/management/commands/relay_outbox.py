@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auditlog.outbox import get_sinks, relay_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox events to the sinks configured in OUTBOX_SINKS, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Events per batch (default 500).")
+        parser.add_argument("--once", action="store_true", help="Drain the outbox and exit instead of polling.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds to sleep when the outbox is empty.")
+
+    def handle(self, *args, **options):
+        sinks = get_sinks()
+        if not sinks:
+            self.stdout.write("No OUTBOX_SINKS configured; nothing to relay.")
+            return
+
+        delivered = 0
+        while True:
+            try:
+                count = relay_batch(options["batch_size"], sinks)
+            except Exception as e:
+                self.stderr.write(f"Delivery failed, will retry: {e}")
+                count = 0
+                if options["once"]:
+                    raise
+            delivered += count
+            if count:
+                self.stdout.write(f"Delivered {count} events.")
+            elif options["once"]:
+                break
+            else:
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Delivered {delivered} events in total."))
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+HISTORY_TABLES = [
+    "auditlog_purchaseorderhistory",
+    "auditlog_salesorderhistory",
+    "auditlog_warehousestockhistory",
+]
+
+
+def create_timestamp_indexes(apps, schema_editor):
+    # History rows are appended in timestamp order, which is what BRIN is built for:
+    # a tiny index that prunes whole block ranges. Other databases get a B-tree.
+    using = " USING brin" if schema_editor.connection.vendor == "postgresql" else ""
+    for table in HISTORY_TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{table}_timestamp_idx" ON "{table}"{using} ("timestamp")'
+        )
+
+
+def drop_timestamp_indexes(apps, schema_editor):
+    for table in HISTORY_TABLES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_timestamp_idx"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditlog', '0003_outboxevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_timestamp_indexes, drop_timestamp_indexes),
+    ]
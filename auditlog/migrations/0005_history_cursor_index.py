@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditlog', '0004_history_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorderhistory',
+            index=models.Index(fields=['timestamp', 'id'], name='auditlog_pu_timesta_d94c16_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorderhistory',
+            index=models.Index(fields=['timestamp', 'id'], name='auditlog_sa_timesta_90bb9a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='warehousestockhistory',
+            index=models.Index(fields=['timestamp', 'id'], name='auditlog_wa_timesta_75bde6_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations
+
+# Frozen copies: this migration must keep doing what it did when it was written,
+# whatever later happens to auditlog.partitions
+HISTORY_TABLES = [
+    "auditlog_purchaseorderhistory",
+    "auditlog_salesorderhistory",
+    "auditlog_warehousestockhistory",
+]
+MONTHS_AHEAD = 3
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_table(schema_editor, table):
+    """
+    Turn a plain history table into a month-partitioned one, copying its rows over.
+
+    Postgres requires the partition key in every unique constraint, so the primary
+    key becomes (id, timestamp); ids still come from one sequence and stay unique.
+    """
+    legacy = f"{table}_unpartitioned"
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+    execute(f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+    # The old table keeps its own "<table>_id_seq" until it is dropped, hence a new name
+    execute(f'CREATE SEQUENCE "{table}_pk_seq" OWNED BY "{table}"."id"')
+    execute(f'''ALTER TABLE "{table}" ALTER COLUMN "id" SET DEFAULT nextval('"{table}_pk_seq"')''')
+    execute(f'''SELECT setval('"{table}_pk_seq"', COALESCE((SELECT MAX("id") FROM "{legacy}"), 0) + 1, false)''')
+    execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY ("id", "timestamp")')
+    execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+    # One partition per month that already has rows, through a few months ahead
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("timestamp") FROM "{legacy}"')
+        oldest = cursor.fetchone()[0]
+    now = datetime.now(dt_timezone.utc)
+    month = month_start(oldest or now)
+    last = add_months(month_start(now), MONTHS_AHEAD)
+    while month <= last:
+        execute(
+            f'CREATE TABLE IF NOT EXISTS "{table}_p{month:%Y_%m}" PARTITION OF "{table}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        month = add_months(month, 1)
+
+    # Indexes on the old table go with it; recreate them (same names) on the parent
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT LIKE %s",
+            [legacy, "%_pkey"],
+        )
+        indexes = cursor.fetchall()
+    execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+    execute(f'DROP TABLE "{legacy}"')
+    for _, definition in indexes:
+        execute(re.sub(r" ON (ONLY )?\S+ USING ", f' ON "{table}" USING ', definition, count=1))
+
+
+def partition_history_tables(apps, schema_editor):
+    # SQLite (development) has no declarative partitioning; the tables stay as they are
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in HISTORY_TABLES:
+        partition_table(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditlog', '0005_history_cursor_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_history_tables, migrations.RunPython.noop),
+    ]
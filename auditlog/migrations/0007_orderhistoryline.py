@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 18:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditlog', '0006_partition_history'),
+        ('inventory', '0008_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorderhistory',
+            name='order_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='salesorderhistory',
+            name='order_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='OrderHistoryLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_type', models.CharField(choices=[('purchase', 'Purchase Order'), ('sales', 'Sales Order')], max_length=10)),
+                ('order_id', models.PositiveIntegerField()),
+                ('product_name', models.CharField(max_length=255)),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='history_lines', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'timestamp'], name='auditlog_or_product_21b30e_idx'), models.Index(fields=['order_type', 'order_id', 'timestamp'], name='auditlog_or_order_t_1026f6_idx')],
+            },
+        ),
+    ]
@@ -19,6 +19,7 @@ ACTION_CHOICES = [
 # Historical model for Purchase Orders
 class PurchaseOrderHistory(models.Model):
     created_by = models.CharField(max_length=255)
+    order_id = models.PositiveIntegerField(null=True, blank=True)  # Links the entry to its OrderHistoryLine rows
     products = models.JSONField()  # List of product names
     quantities = models.JSONField() # List of quantities per product
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
@@ -26,12 +27,17 @@ class PurchaseOrderHistory(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     timestamp = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        # Serves the (timestamp, id) cursor of the history lists; see migration 0004 for range scans
+        indexes = [models.Index(fields=['timestamp', 'id'])]
+
     def __str__(self):
         return f"Purchase Order by {self.created_by} - {self.action} on {self.timestamp}"
 
 # Historical model for Sales Orders
 class SalesOrderHistory(models.Model):
     customer_name = models.CharField(max_length=255)
+    order_id = models.PositiveIntegerField(null=True, blank=True)  # Links the entry to its OrderHistoryLine rows
     products = models.JSONField()
     quantities = models.JSONField()
     # products = ArrayField(models.CharField(max_length=255))
@@ -41,6 +47,10 @@ class SalesOrderHistory(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     timestamp = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        # Serves the (timestamp, id) cursor of the history lists; see migration 0004 for range scans
+        indexes = [models.Index(fields=['timestamp', 'id'])]
+
     def __str__(self):
         return f"Sales Order for {self.customer_name} - {self.action} on {self.timestamp}"
 
@@ -52,5 +62,106 @@ class WarehouseStockHistory(models.Model):
     action = models.CharField(max_length=50)
     timestamp = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        # Serves the (timestamp, id) cursor of the history lists; see migration 0004 for range scans
+        indexes = [models.Index(fields=['timestamp', 'id'])]
+
     def __str__(self):
         return f"Stock Update for {self.warehouse_name} - {self.action} on {self.timestamp}"
+
+# One row per order item in a purchase or sales history entry, with the product and the
+# price at the time, so history can be filtered by product, supplier or category in SQL.
+# Lines share order_id and timestamp with the entry they belong to.
+class OrderHistoryLine(models.Model):
+    ORDER_TYPES = [
+        ('purchase', 'Purchase Order'),
+        ('sales', 'Sales Order'),
+    ]
+
+    order_type = models.CharField(max_length=10, choices=ORDER_TYPES)
+    order_id = models.PositiveIntegerField()
+    product = models.ForeignKey('inventory.Product', on_delete=models.SET_NULL, null=True, related_name='history_lines')
+    product_name = models.CharField(max_length=255)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'timestamp']),
+            models.Index(fields=['order_type', 'order_id', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name} in {self.order_type} order #{self.order_id} on {self.timestamp}"
+
+# Completed sales summed per day and per product, warehouse or customer, rebuilt from
+# OrderHistoryLine by `python manage.py refresh_rollups` (see auditlog/rollups.py)
+class DailySalesRollup(models.Model):
+    DIMENSIONS = [
+        ('product', 'Product'),
+        ('warehouse', 'Warehouse'),
+        ('customer', 'Customer'),
+    ]
+
+    day = models.DateField()
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS)
+    key_id = models.PositiveIntegerField()  # Product, warehouse or customer id
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'day', 'key_id'], name='unique_daily_sales_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.key_id} on {self.day}: {self.units} units, {self.revenue}"
+
+
+# Completed purchases summed per day and product, rebuilt alongside the sales rollups
+class DailyPurchaseRollup(models.Model):
+    day = models.DateField()
+    key_id = models.PositiveIntegerField()  # Product id
+    units = models.PositiveIntegerField(default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'key_id'], name='unique_daily_purchase_rollup'),
+        ]
+
+    def __str__(self):
+        return f"product {self.key_id} on {self.day}: {self.units} units, {self.cost}"
+
+
+# How far a periodic job has read an append-only table. Ids are not committed in
+# order, so each run re-reads from the id the run before it reached (overlap_id).
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    overlap_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at #{self.last_id}"
+
+# Events written in the same transaction as the change that caused them, and
+# delivered to the configured sinks later by `manage.py relay_outbox`
+class OutboxEvent(models.Model):
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    delivered_to = models.JSONField(default=list, blank=True)  # Names of the sinks that have the event
+
+    class Meta:
+        indexes = [models.Index(fields=['processed_at', 'id'])]
+
+    def __str__(self):
+        return f"{self.topic} event #{self.id} on {self.created_at}"
@@ -0,0 +1,200 @@
+import json
+
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from auditlog import buffer
+from auditlog.models import OutboxEvent
+
+AUDIT_TABLE_SINK = "auditlog.outbox.AuditTableSink"
+
+
+def get_sinks():
+    return [import_string(path)() for path in getattr(settings, "OUTBOX_SINKS", [])]
+
+
+def audit_via_outbox():
+    """True when history rows are written by the relay instead of inside the request."""
+    return AUDIT_TABLE_SINK in getattr(settings, "OUTBOX_SINKS", [])
+
+
+def publish(topic, payload):
+    """
+    Write one OutboxEvent in the caller's transaction, so it is only delivered if the
+    change that produced it commits. Does nothing when no sinks are configured; each
+    sink picks the topics it wants when the relay delivers.
+    """
+    if not getattr(settings, "OUTBOX_SINKS", []):
+        return None
+    # Round-trip through DjangoJSONEncoder so Decimals and datetimes are stored as strings
+    payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def record_history(model, rows):
+    """
+    Record audit history rows (dicts of `model` field values).
+
+    With any sink configured the rows are also published as one outbox event, topic
+    "<app>.<model>", so order and stock changes reach the file and webhook sinks.
+    Normally the rows are buffered and bulk-inserted when the transaction commits
+    (see auditlog.buffer); with the audit table sink configured the relay writes
+    them from that event instead.
+    """
+    if not rows:
+        return
+    publish(model._meta.label_lower, {"rows": rows})
+    if not audit_via_outbox():
+        buffer.add(model, rows)
+
+
+class Sink:
+    """
+    Base class of the outbox sinks. `topics` lists the topic prefixes a sink is sent;
+    None (or an empty setting) means every topic.
+    """
+    topics = None
+
+    @property
+    def name(self):
+        """Recorded in OutboxEvent.delivered_to once the sink has an event."""
+        return f"{type(self).__module__}.{type(self).__qualname__}"
+
+    def accepts(self, topic):
+        return not self.topics or topic.startswith(tuple(self.topics))
+
+    def send(self, events):
+        raise NotImplementedError
+
+
+class FileSink(Sink):
+    """Append events as JSON lines to OUTBOX_FILE_PATH."""
+
+    def __init__(self):
+        self.path = getattr(settings, "OUTBOX_FILE_PATH", settings.BASE_DIR / "outbox.jsonl")
+        self.topics = getattr(settings, "OUTBOX_FILE_TOPICS", None)
+
+    def send(self, events):
+        with open(self.path, "a", encoding="utf-8") as outbox_file:
+            for event in events:
+                outbox_file.write(json.dumps(_event_dict(event), cls=DjangoJSONEncoder) + "\n")
+
+
+class WebhookSink(Sink):
+    """POST each batch of events as JSON to OUTBOX_WEBHOOK_URL."""
+
+    def __init__(self):
+        self.url = getattr(settings, "OUTBOX_WEBHOOK_URL", "")
+        self.timeout = getattr(settings, "OUTBOX_WEBHOOK_TIMEOUT", 10)
+        self.topics = getattr(settings, "OUTBOX_WEBHOOK_TOPICS", None)
+
+    def send(self, events):
+        if not self.url:
+            return
+        response = requests.post(
+            self.url,
+            data=json.dumps([_event_dict(event) for event in events], cls=DjangoJSONEncoder),
+            headers={"Content-Type": "application/json"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+
+class AuditTableSink(Sink):
+    """Write history events into their audit tables with one bulk_create per model."""
+    topics = ["auditlog."]
+
+    def send(self, events):
+        rows_by_model = {}
+        for event in events:
+            try:
+                model = apps.get_model(event.topic)
+            except (LookupError, ValueError):
+                continue  # Not a history event
+            rows = rows_by_model.setdefault(model, [])
+            for row in event.payload.get("rows", []):
+                rows.append(model(**{"timestamp": event.created_at, **row}))
+        for model, rows in rows_by_model.items():
+            model.objects.bulk_create(rows)
+
+
+def _event_dict(event):
+    return {"id": event.id, "topic": event.topic, "payload": event.payload, "created_at": event.created_at}
+
+
+def _send(sink, events):
+    """
+    Send `events` to `sink` in one batch or, if that fails, one at a time up to the
+    first that fails on its own. Returns (events sent, (failed event, error) or None).
+    """
+    try:
+        with transaction.atomic():
+            sink.send(events)
+        return events, None
+    except Exception:
+        pass
+    sent = []
+    for event in events:
+        try:
+            with transaction.atomic():
+                sink.send([event])
+        except Exception as error:
+            return sent, (event, error)
+        sent.append(event)
+    return sent, None
+
+
+def relay_batch(batch_size=500, sinks=None):
+    """
+    Deliver the oldest unprocessed events to every sink and mark them processed.
+
+    Events are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several relays can
+    run side by side. Each event records the sinks it has reached (delivered_to), so
+    a retry only goes to the sinks that have not had it. When a sink fails, the
+    events before the first one it cannot take are still delivered to it; that
+    event's attempt count is bumped and the error re-raised. An event that has
+    failed OUTBOX_MAX_ATTEMPTS times is parked (skipped from then on, with its
+    last_error) so it cannot hold back the queue. Returns the number of events
+    delivered to every sink that wants them.
+    """
+    sinks = get_sinks() if sinks is None else sinks
+    max_attempts = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 5)
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, attempts__lt=max_attempts)
+            .order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+        failures = {}  # event id -> the first error it met
+        for sink in sinks:
+            pending = [event for event in events if sink.accepts(event.topic) and sink.name not in event.delivered_to]
+            if not pending:
+                continue
+            sent, failure = _send(sink, pending)
+            for event in sent:
+                event.delivered_to.append(sink.name)
+            if failure is not None:
+                failures.setdefault(failure[0].id, failure[1])
+
+        delivered = [
+            event for event in events
+            if all(sink.name in event.delivered_to for sink in sinks if sink.accepts(event.topic))
+        ]
+        OutboxEvent.objects.filter(id__in=[event.id for event in delivered]).update(processed_at=timezone.now())
+        partial = [event for event in events if event not in delivered and event.delivered_to]
+        if partial:
+            OutboxEvent.objects.bulk_update(partial, ["delivered_to"])
+        for event_id, error in failures.items():
+            OutboxEvent.objects.filter(id=event_id).update(attempts=F("attempts") + 1, last_error=str(error))
+    # Raised only after the attempt counts have been committed
+    if failures:
+        raise failures[min(failures)]
+    return len(delivered)
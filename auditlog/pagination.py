@@ -0,0 +1,100 @@
+from base64 import b64decode, b64encode
+from datetime import datetime
+from urllib import parse
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class HistoryCursorPagination(BasePagination):
+    """
+    Newest first, keyed on (timestamp, id): the cursor holds the (timestamp, id) of the
+    row a page continues from, so each page is an index range scan with no COUNT(*)
+    and no OFFSET. Many rows share a timestamp (a stock batch is stamped once), so the
+    id is part of the key rather than a tie-break by offset as in DRF's CursorPagination.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, "AUDITLOG_PAGE_SIZE", 50)
+        max_page_size = getattr(settings, "AUDITLOG_MAX_PAGE_SIZE", 500)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return min(requested, max_page_size) if requested > 0 else page_size
+
+    def decode_cursor(self, request):
+        """(reverse, timestamp, id) from the request's cursor, or None on the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(b64decode(encoded.encode("ascii")).decode("ascii"), strict_parsing=True)
+            return tokens["r"][0] == "1", datetime.fromisoformat(tokens["t"][0]), int(tokens["i"][0])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, reverse, row):
+        tokens = {"r": "1" if reverse else "0", "t": row.timestamp.isoformat(), "i": row.pk}
+        encoded = b64encode(parse.urlencode(tokens).encode("ascii")).decode("ascii")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[0]
+
+        if reverse:
+            queryset = queryset.order_by("timestamp", "id")
+        else:
+            queryset = queryset.order_by("-timestamp", "-id")
+        if cursor is not None:
+            _, timestamp, pk = cursor
+            if reverse:
+                queryset = queryset.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Walking backwards, the rows after this page are the ones the cursor came from
+        has_next = has_more if not reverse else cursor is not None
+        has_previous = has_more if reverse else cursor is not None
+        self.next_link = self.encode_cursor(False, rows[-1]) if rows and has_next else None
+        self.previous_link = self.encode_cursor(True, rows[0]) if rows and has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.next_link, "previous": self.previous_link, "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class HistoryPageNumberPagination(PageNumberPagination):
+    """Numbered pages for clients that need a total count or to jump to page N."""
+    page_size_query_param = "page_size"
+
+    def get_page_size(self, request):
+        self.max_page_size = getattr(settings, "AUDITLOG_MAX_PAGE_SIZE", 500)
+        return super().get_page_size(request)
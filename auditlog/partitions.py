@@ -0,0 +1,117 @@
+"""
+Month partitions for the audit history tables.
+
+On Postgres each history table is partitioned by RANGE (timestamp) into one partition
+per calendar month (UTC) plus a DEFAULT partition, so queries on recent history only
+touch recent partitions and old months can be dropped whole. On other databases
+(SQLite in development) the tables stay plain and old months are deleted instead.
+The tables are converted by migration 0006, which carries its own copy of the DDL.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+HISTORY_TABLES = [
+    "auditlog_purchaseorderhistory",
+    "auditlog_salesorderhistory",
+    "auditlog_warehousestockhistory",
+]
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def is_partitioned(table, using=connection):
+    if using.vendor != "postgresql":
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partition(table, month, using=connection):
+    """Create the partition holding `month` (a month_start) if it does not exist yet."""
+    with using.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" PARTITION OF "{table}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+
+
+def ensure_partitions(months_ahead=3, now=None, using=connection):
+    """Create the partitions of the current month and the next `months_ahead` months."""
+    current = month_start(now or datetime.now(dt_timezone.utc))
+    for table in HISTORY_TABLES:
+        if is_partitioned(table, using):
+            for offset in range(months_ahead + 1):
+                create_partition(table, add_months(current, offset), using)
+
+
+def drop_partition(table, month, using=connection):
+    """Drop the partition holding `month`; returns False when there is none."""
+    if not is_partitioned(table, using):
+        return False
+    name = partition_name(table, month)
+    with using.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [f'"{name}"'])
+        if cursor.fetchone()[0] is None:
+            return False
+        cursor.execute(f'DROP TABLE "{name}"')
+    return True
+
+
+def archive_path(directory, table, month):
+    """
+    `<directory>/<table>_<YYYY_MM>.jsonl.gz`, or, when that month was archived before
+    (rows that arrived late), `<table>_<YYYY_MM>_<run time>.jsonl.gz`.
+    """
+    path = Path(directory) / f"{table}_{month:%Y_%m}.jsonl.gz"
+    if path.exists():
+        path = path.with_name(f"{table}_{month:%Y_%m}_{datetime.now(dt_timezone.utc):%Y%m%dT%H%M%S%f}.jsonl.gz")
+    return path
+
+
+def archive_month(model, month, directory, chunk_size=2000):
+    """
+    Stream one month of `model` rows into a new file from archive_path(), then drop
+    the month's partition (Postgres) or delete its rows (elsewhere).
+
+    Rows are read with a chunked iterator so memory stays flat however large the
+    month is, and nothing is removed until the file has been written completely.
+    An existing archive is never overwritten. Returns the number of rows archived.
+    """
+    table = model._meta.db_table
+    rows = model.objects.filter(timestamp__gte=month, timestamp__lt=add_months(month, 1))
+    path = archive_path(directory, table, month)
+    partial = path.with_name(path.name + ".part")
+
+    count = 0
+    with gzip.open(partial, "wt", encoding="utf-8") as archive:
+        for row in rows.order_by("timestamp", "id").values().iterator(chunk_size=chunk_size):
+            archive.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+            count += 1
+    os.link(partial, path)  # Unlike a rename, fails if the file exists
+    os.unlink(partial)
+
+    with transaction.atomic():
+        drop_partition(table, month)
+        rows.delete()  # Plain tables, and rows that landed in the DEFAULT partition
+    return count
@@ -0,0 +1,169 @@
+"""
+Daily sales and purchase rollups.
+
+Every save of an approved, completed or cancelled order appends a snapshot of its
+lines to OrderHistoryLine, so an order can have several completed snapshots, and a
+completed order can be cancelled later. An order is counted once, on the day it was
+first completed, with the lines of its latest snapshot, and only while that latest
+snapshot is still completed.
+
+Sales are summed per product, per customer and per warehouse (split by the order's
+SalesOrderAllocation rows) into DailySalesRollup; purchases per product into
+DailyPurchaseRollup. Purchase orders do not reference a supplier, so there is no
+supplier dimension.
+
+refresh_rollups() rebuilds only the days of orders that gained lines since the last
+run. Days are recomputed whole, so running it twice, or over a day already done,
+changes nothing.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from auditlog.models import DailyPurchaseRollup, DailySalesRollup, OrderHistoryLine, RollupWatermark
+from inventory.stock import DEFAULT_WAREHOUSE_ID
+from orders.models import SalesOrder, SalesOrderAllocation
+
+WATERMARK = "daily_sales_rollup"
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _completion_days(order_type, order_ids=None, since=None):
+    """{order_id: timestamp of the order's first completed snapshot}, for some orders or those completed since."""
+    completed = OrderHistoryLine.objects.filter(order_type=order_type, status="completed")
+    if order_ids is not None:
+        completed = completed.filter(order_id__in=order_ids)
+    first = completed.values("order_id").annotate(first=Min("timestamp"))
+    if since is not None:
+        first = first.filter(first__gte=since)
+    return dict(first.values_list("order_id", "first"))
+
+
+def _counted_lines(order_type, day):
+    """(order_id, product_id, quantity, unit_price) of the orders that count on `day`."""
+    start, end = _day_bounds(day)
+    completed_that_day = (
+        OrderHistoryLine.objects.filter(order_type=order_type, status="completed", timestamp__gte=start, timestamp__lt=end)
+        .values_list("order_id", flat=True)
+        .distinct()
+    )
+    order_ids = [
+        order_id for order_id, first in _completion_days(order_type, order_ids=completed_that_day).items()
+        if start <= first < end
+    ]
+    snapshots = (
+        OrderHistoryLine.objects.filter(order_type=order_type, order_id__in=order_ids)
+        .values_list("order_id", "timestamp", "status", "product_id", "quantity", "unit_price")
+    )
+    latest = {}
+    for order_id, timestamp, status, product_id, quantity, unit_price in snapshots:
+        if order_id not in latest or timestamp > latest[order_id][0]:
+            latest[order_id] = (timestamp, status, [])
+        if timestamp == latest[order_id][0]:
+            latest[order_id][2].append((order_id, product_id, quantity, unit_price))
+    return [line for _, status, lines in latest.values() if status == "completed" for line in lines]
+
+
+def _totals():
+    return defaultdict(lambda: [0, Decimal("0"), set()])  # key -> units, amount, orders
+
+
+def _add(totals, key, units, unit_price, order_id):
+    total = totals[key]
+    total[0] += units
+    total[1] += units * unit_price
+    total[2].add(order_id)
+
+
+def rollup_day(day):
+    """Recompute every sales rollup row of `day`."""
+    lines = _counted_lines("sales", day)
+    order_ids = {order_id for order_id, _, _, _ in lines}
+    customers = dict(SalesOrder.objects.filter(id__in=order_ids).values_list("id", "customer_id"))
+    allocations = defaultdict(list)
+    for order_id, product_id, warehouse_id, quantity in SalesOrderAllocation.objects.filter(
+        sales_order_id__in=order_ids
+    ).values_list("sales_order_id", "product_id", "warehouse_id", "quantity"):
+        allocations[(order_id, product_id)].append((warehouse_id, quantity))
+
+    totals = _totals()  # (dimension, key) -> units, revenue, orders
+    for order_id, product_id, quantity, unit_price in lines:
+        _add(totals, ("product", product_id), quantity, unit_price, order_id)
+        if customers.get(order_id) is not None:
+            _add(totals, ("customer", customers[order_id]), quantity, unit_price, order_id)
+        # Orders approved before allocations were recorded shipped from the default warehouse
+        for warehouse_id, allocated in allocations.get((order_id, product_id)) or [(DEFAULT_WAREHOUSE_ID, quantity)]:
+            _add(totals, ("warehouse", warehouse_id), allocated, unit_price, order_id)
+
+    with transaction.atomic():
+        DailySalesRollup.objects.filter(day=day).delete()
+        DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(
+                day=day, dimension=dimension, key_id=key,
+                units=units, revenue=revenue, order_count=len(orders),
+            )
+            for (dimension, key), (units, revenue, orders) in totals.items()
+        ])
+
+
+def rollup_purchase_day(day):
+    """Recompute every purchase rollup row of `day`."""
+    totals = _totals()  # product -> units, cost, orders
+    for order_id, product_id, quantity, unit_price in _counted_lines("purchase", day):
+        _add(totals, product_id, quantity, unit_price, order_id)
+
+    with transaction.atomic():
+        DailyPurchaseRollup.objects.filter(day=day).delete()
+        DailyPurchaseRollup.objects.bulk_create([
+            DailyPurchaseRollup(day=day, key_id=key, units=units, cost=cost, order_count=len(orders))
+            for key, (units, cost, orders) in totals.items()
+        ])
+
+
+def _local_dates(timestamps):
+    return {timezone.localtime(timestamp).date() for timestamp in timestamps}
+
+
+def refresh_rollups(since=None):
+    """
+    Rebuild the days of the orders that gained lines since the watermark (or every
+    day from `since`, a date, when given) and move the watermark forward. Returns
+    the days, sales and purchase days together.
+
+    Lines are read from the id the previous run reached, not the last one, so a line
+    whose transaction committed after a higher id had been read is still picked up.
+    """
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        last_id = OrderHistoryLine.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+
+        days = {}
+        for order_type in ("sales", "purchase"):
+            if since is not None:
+                start, _ = _day_bounds(since)
+                firsts = _completion_days(order_type, since=start).values()
+            else:
+                order_ids = (
+                    OrderHistoryLine.objects.filter(order_type=order_type, id__gt=watermark.overlap_id, id__lte=last_id)
+                    .values_list("order_id", flat=True)
+                    .distinct()
+                )
+                firsts = _completion_days(order_type, order_ids=order_ids).values()
+            days[order_type] = _local_dates(firsts)
+
+        for day in sorted(days["sales"]):
+            rollup_day(day)
+        for day in sorted(days["purchase"]):
+            rollup_purchase_day(day)
+        watermark.overlap_id = max(watermark.last_id, watermark.overlap_id)
+        watermark.last_id = max(last_id, watermark.last_id)
+        watermark.save()
+    return sorted(days["sales"] | days["purchase"])
@@ -1,9 +1,24 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from orders.models import PurchaseOrder, SalesOrder, PurchaseOrderItem, SalesOrderItem
-from auditlog.models import PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
+from auditlog.models import OrderHistoryLine, PurchaseOrderHistory, SalesOrderHistory, WarehouseStockHistory
 from inventory.models import WarehouseStock
 from django.utils import timezone
+from auditlog.outbox import record_history
+
+
+def _history_lines(order_type, instance, items, timestamp):
+    """OrderHistoryLine rows for `items`, carrying the entry's order_id and timestamp."""
+    return [dict(
+        order_type=order_type,
+        order_id=instance.pk,
+        product_id=item.product_id,
+        product_name=item.product.name,
+        quantity=item.quantity,
+        unit_price=item.product.unit_price,
+        status=instance.status,
+        timestamp=timestamp,
+    ) for item in items]
 
 @receiver(post_save, sender=PurchaseOrder)
 def log_purchase_order_history(sender, instance, created, **kwargs):
@@ -12,28 +27,35 @@ def log_purchase_order_history(sender, instance, created, **kwargs):
     """
     # Log when a new purchase order is created
     if created:
-        PurchaseOrderHistory.objects.create(
+        record_history(PurchaseOrderHistory, [dict(
             created_by=instance.created_by.username,
+            order_id=instance.pk,
             products=[],  # Empty on creation
             quantities=[],  # Empty on creation
             status=instance.status,
             action='created',  # Action is creation
-            total_amount=instance.total_amount
-        )
+            total_amount=0  # Items are added after the order row exists
+        )])
     # Log if status is changed to approved, completed, or cancelled
     elif instance.status in ['approved', 'completed', 'cancelled']:
-        products = [item.product.name for item in instance.items.all()]
-        quantities = [item.quantity for item in instance.items.all()]
+        # One pass over the items (prefetched by the view, or loaded once here), shared with the serializer
+        items = instance.prefetch_items()
+        products = [item.product.name for item in items]
+        quantities = [item.quantity for item in items]
         action = 'status_changed' if instance.status == 'approved' else f"order_{instance.status}"
-        
-        PurchaseOrderHistory.objects.create(
+        timestamp = timezone.now()
+
+        record_history(PurchaseOrderHistory, [dict(
             created_by=instance.created_by.username,
+            order_id=instance.pk,
             products=products,
             quantities=quantities,
             status=instance.status,
             action=action,  # Action could be 'status_changed', 'order_completed', or 'order_cancelled'
-            total_amount=instance.total_amount
-        )
+            total_amount=instance.total_amount,
+            timestamp=timestamp,
+        )])
+        record_history(OrderHistoryLine, _history_lines('purchase', instance, items, timestamp))
 
 
 @receiver(post_save, sender=SalesOrder)
@@ -43,28 +65,35 @@ def log_sales_order_history(sender, instance, created, **kwargs):
     """
     # Log when a new sales order is created
     if created:
-        SalesOrderHistory.objects.create(
+        record_history(SalesOrderHistory, [dict(
             customer_name=instance.customer.user.username,
+            order_id=instance.pk,
             products=[],  # Empty on creation
             quantities=[],  # Empty on creation
             status=instance.status,
             action='created',  # Action is creation
-            total_amount=instance.total_amount
-        )
+            total_amount=0  # Items are added after the order row exists
+        )])
     # Log if status is changed to approved, completed, or cancelled
     elif instance.status in ['approved', 'completed', 'cancelled']:
-        products = [item.product.name for item in instance.items.all()]
-        quantities = [item.quantity for item in instance.items.all()]
+        # One pass over the items (prefetched by the view, or loaded once here), shared with the serializer
+        items = instance.prefetch_items()
+        products = [item.product.name for item in items]
+        quantities = [item.quantity for item in items]
         action = 'status_changed' if instance.status == 'approved' else f"order_{instance.status}"
-        
-        SalesOrderHistory.objects.create(
+        timestamp = timezone.now()
+
+        record_history(SalesOrderHistory, [dict(
             customer_name=instance.customer.user.username,
+            order_id=instance.pk,
             products=products,
             quantities=quantities,
             status=instance.status,
             action=action,  
-            total_amount=instance.total_amount
-        )
+            total_amount=instance.total_amount,
+            timestamp=timestamp,
+        )])
+        record_history(OrderHistoryLine, _history_lines('sales', instance, items, timestamp))
 
 @receiver(post_save, sender=WarehouseStock)
 def update_warehouse_stock_history(sender, instance, created, **kwargs):
@@ -77,10 +106,10 @@ def update_warehouse_stock_history(sender, instance, created, **kwargs):
 
     action = "created" if created else "updated"
 
-    WarehouseStockHistory.objects.create(
+    record_history(WarehouseStockHistory, [dict(
         warehouse_name=instance.warehouse.name,
         products={instance.product.id: instance.product.name},
         quantities={instance.product.id: instance.quantity},
         action=action,  # Use the default action here (created or updated)
         timestamp=timezone.now(),
-    )
+    )])
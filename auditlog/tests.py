@@ -1,3 +1,557 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from inventory.models import Category, Product, WarehouseStock
+from inventory.functions import transfer_product
+from warehouse.models import Warehouse
+from auditlog.models import DailyPurchaseRollup, DailySalesRollup, OrderHistoryLine, OutboxEvent, PurchaseOrderHistory, WarehouseStockHistory
+from auditlog import buffer
+from auditlog.outbox import AUDIT_TABLE_SINK, FileSink, Sink, relay_batch
+from auditlog.filters import PurchaseOrderHistoryFilter, WarehouseStockHistoryFilter
+from orders.models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderAllocation
+from users.models import Customer
+from auditlog.rollups import refresh_rollups
+
+
+class WarehouseTestCase(TestCase):
+    """The Main (id 1) and Branch (id 2) warehouses and a Hammer in Tools, `main_stock` of it in Main."""
+    main_stock = 10
+
+    def setUp(self):
+        self.main = Warehouse.objects.create(id=1, name="Main", address="Street 1", country="Ethiopia")
+        self.branch = Warehouse.objects.create(id=2, name="Branch", address="Street 2", country="Ethiopia")
+        self.category = Category.objects.create(name="Tools", description="Hand tools")
+        self.product = Product.objects.create(name="Hammer", category=self.category, unit_price="10.00")
+        if self.main_stock is not None:
+            WarehouseStock.objects.create(product=self.product, warehouse=self.main, quantity=self.main_stock)
+
+
+class OutboxTest(WarehouseTestCase):
+    def setUp(self):
+        super().setUp()
+        WarehouseStockHistory.objects.all().delete()
+
+    def test_no_events_without_sinks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            transfer_product(self.main.id, self.branch.id, self.product.id, 2)
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(WarehouseStockHistory.objects.filter(action__startswith="transfer").count(), 2)
+
+    @override_settings(OUTBOX_SINKS=[AUDIT_TABLE_SINK])
+    def test_audit_history_is_written_by_the_relay(self):
+        transfer_product(self.main.id, self.branch.id, self.product.id, 2)
+
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+        self.assertFalse(WarehouseStockHistory.objects.exists())
+
+        self.assertEqual(relay_batch(), 1)
+        self.assertEqual(
+            sorted(WarehouseStockHistory.objects.values_list("action", flat=True)),
+            ["transfer-in", "transfer-out"],
+        )
+        self.assertFalse(OutboxEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_file_sink_writes_json_lines(self):
+        event = OutboxEvent.objects.create(topic="test", payload={"value": 1})
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "outbox.jsonl"
+            with override_settings(OUTBOX_FILE_PATH=path):
+                FileSink().send([event])
+            line = json.loads(path.read_text().strip())
+        self.assertEqual(line["payload"], {"value": 1})
+
+    def test_stock_changes_reach_the_file_sink(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "outbox.jsonl"
+            with override_settings(OUTBOX_SINKS=["auditlog.outbox.FileSink"], OUTBOX_FILE_PATH=path):
+                with self.captureOnCommitCallbacks(execute=True):
+                    transfer_product(self.main.id, self.branch.id, self.product.id, 2)
+                self.assertEqual(relay_batch(), 1)
+            lines = [json.loads(line) for line in path.read_text().splitlines()]
+
+        self.assertEqual([line["topic"] for line in lines], ["auditlog.warehousestockhistory"])
+        self.assertEqual(sorted(row["action"] for row in lines[0]["payload"]["rows"]), ["transfer-in", "transfer-out"])
+        # Without the audit table sink the history is still written in the request
+        self.assertEqual(WarehouseStockHistory.objects.filter(action__startswith="transfer").count(), 2)
+
+    def test_sinks_only_get_their_topics(self):
+        sink = RecordingSink(topics=["orders."])
+        OutboxEvent.objects.create(topic="auditlog.salesorderhistory", payload={})
+        OutboxEvent.objects.create(topic="orders.salesorder", payload={})
+
+        self.assertEqual(relay_batch(sinks=[sink]), 2)
+        self.assertEqual(sink.topics_sent, ["orders.salesorder"])
+
+    @override_settings(OUTBOX_SINKS=["auditlog.outbox.FileSink"], OUTBOX_MAX_ATTEMPTS=2)
+    def test_a_failing_event_is_parked_without_blocking_the_rest(self):
+        sink = RecordingSink(fail_on="poison")
+        first = OutboxEvent.objects.create(topic="good", payload={})
+        poison = OutboxEvent.objects.create(topic="poison", payload={})
+        last = OutboxEvent.objects.create(topic="good", payload={})
+
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                relay_batch(sinks=[sink])
+        self.assertEqual(relay_batch(sinks=[sink]), 1)
+
+        for event in (first, poison, last):
+            event.refresh_from_db()
+        self.assertIsNotNone(first.processed_at)
+        self.assertIsNotNone(last.processed_at)
+        self.assertIsNone(poison.processed_at)
+        self.assertEqual((poison.attempts, poison.last_error), (2, "cannot send poison"))
+        self.assertEqual(relay_batch(sinks=[sink]), 0)
+
+    def test_a_retry_only_goes_to_the_sinks_that_failed(self):
+        recording, flaky = RecordingSink(), FlakySink(fail_on="stock")
+        event = OutboxEvent.objects.create(topic="stock", payload={})
+
+        with self.assertRaises(RuntimeError):
+            relay_batch(sinks=[recording, flaky])
+        event.refresh_from_db()
+        self.assertEqual((event.delivered_to, event.attempts, event.processed_at), ([recording.name], 1, None))
+
+        flaky.fail_on = None
+        self.assertEqual(relay_batch(sinks=[recording, flaky]), 1)
+        self.assertEqual((recording.topics_sent, flaky.topics_sent), (["stock"], ["stock"]))
+
+
+class RecordingSink(Sink):
+    def __init__(self, topics=None, fail_on=None):
+        self.topics = topics
+        self.fail_on = fail_on
+        self.topics_sent = []
+
+    def send(self, events):
+        if any(event.topic == self.fail_on for event in events):
+            raise RuntimeError(f"cannot send {self.fail_on}")
+        self.topics_sent.extend(event.topic for event in events)
+
+
+class FlakySink(RecordingSink):
+    pass
+
+
+class AuditBufferTest(TestCase):
+    def rows(self, count):
+        return [dict(warehouse_name="Main", products={}, quantities={}, action="updated") for _ in range(count)]
+
+    def test_rows_are_written_once_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            buffer.add(WarehouseStockHistory, self.rows(3))
+            buffer.add(WarehouseStockHistory, self.rows(2))
+            self.assertFalse(WarehouseStockHistory.objects.exists())
+
+        self.assertEqual(WarehouseStockHistory.objects.count(), 5)
+
+    def test_rows_are_dropped_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    buffer.add(WarehouseStockHistory, self.rows(3))
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertFalse(WarehouseStockHistory.objects.exists())
+
+    def test_rows_of_a_rolled_back_savepoint_are_dropped(self):
+        def add(action):
+            buffer.add(WarehouseStockHistory, [dict(warehouse_name="Main", products={}, quantities={}, action=action)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                add("kept")
+                try:
+                    with transaction.atomic():
+                        add("rolledback")
+                        add("rolledback")
+                        raise ValueError
+                except ValueError:
+                    pass
+                with transaction.atomic():
+                    add("inner-kept")
+                add("kept-after")
+
+        self.assertEqual(
+            sorted(WarehouseStockHistory.objects.values_list("action", flat=True)),
+            ["inner-kept", "kept", "kept-after"],
+        )
+
+
+class TimestampFilterTest(TestCase):
+    def setUp(self):
+        for moment in ["2024-01-31 23:00", "2024-02-01 09:00", "2024-02-29 12:00", "2025-02-01 09:00"]:
+            WarehouseStockHistory.objects.create(
+                warehouse_name="Main", products={}, quantities={}, action="updated",
+                timestamp=timezone.make_aware(datetime.fromisoformat(moment)),
+            )
+
+    def count(self, **params):
+        return WarehouseStockHistoryFilter(params, queryset=WarehouseStockHistory.objects.all()).qs.count()
+
+    def test_range_parameters(self):
+        self.assertEqual(self.count(timestamp_after="2024-02-01T00:00:00", timestamp_before="2024-03-01T00:00:00"), 2)
+        self.assertEqual(self.count(timestamp_after="2024-02-15T00:00:00"), 2)
+
+    def test_calendar_parameters_become_ranges(self):
+        self.assertEqual(self.count(year=2024), 3)
+        self.assertEqual(self.count(year=2024, month=2), 2)
+        self.assertEqual(self.count(year=2024, month=2, day=1), 1)
+        self.assertEqual(self.count(year=2024, month=2, day=30), 0)
+        self.assertIn("timestamp\" >=", str(
+            WarehouseStockHistoryFilter({"year": 2024, "month": 12}, queryset=WarehouseStockHistory.objects.all()).qs.query
+        ))
+
+    def test_month_without_year_matches_every_year(self):
+        self.assertEqual(self.count(month=2), 3)
+
+    def test_zero_month_or_day_matches_nothing(self):
+        self.assertEqual(self.count(year=2024, month=0), 0)
+        self.assertEqual(self.count(year=2024, month=2, day=0), 0)
+
+    def test_fractional_parts_are_rejected(self):
+        for params in ({"month": "3.5"}, {"year": "2024", "day": "1.5"}):
+            filterset = WarehouseStockHistoryFilter(params, queryset=WarehouseStockHistory.objects.all())
+            self.assertFalse(filterset.is_valid(), params)
+
+
+class HistoryPaginationTest(TestCase):
+    def setUp(self):
+        moment = timezone.make_aware(datetime(2024, 1, 1))
+        # Two rows share each timestamp, so the cursor has to break ties on id
+        WarehouseStockHistory.objects.bulk_create([
+            WarehouseStockHistory(
+                warehouse_name="Main", products={}, quantities={}, action="updated",
+                timestamp=moment.replace(hour=i // 2),
+            )
+            for i in range(7)
+        ])
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+
+    def test_cursor_pages_cover_every_row_once_newest_first(self):
+        seen = []
+        url = reverse("warehouse-stock-history-list") + "?page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            seen.extend(row["id"] for row in response.data["results"])
+            url = response.data["next"]
+
+        expected = list(WarehouseStockHistory.objects.order_by("-timestamp", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_previous_links_walk_back_over_the_same_pages(self):
+        pages = []
+        url = reverse("warehouse-stock-history-list") + "?page_size=3"
+        while url:
+            response = self.client.get(url)
+            pages.append([row["id"] for row in response.data["results"]])
+            url = response.data["next"]
+        self.assertIsNone(self.client.get(reverse("warehouse-stock-history-list")).data["previous"])
+
+        back = []
+        while response.data["previous"]:
+            response = self.client.get(response.data["previous"])
+            back.append([row["id"] for row in response.data["results"]])
+        self.assertEqual(back, pages[-2::-1])
+
+    @override_settings(AUDITLOG_MAX_PAGE_SIZE=500)
+    def test_rows_sharing_one_timestamp_are_paged_by_id(self):
+        moment = timezone.make_aware(datetime(2024, 6, 1))
+        WarehouseStockHistory.objects.bulk_create([
+            WarehouseStockHistory(warehouse_name="Main", products={}, quantities={}, action="updated", timestamp=moment)
+            for _ in range(2600)
+        ])
+        seen = []
+        url = reverse("warehouse-stock-history-list") + "?page_size=500"
+        while url:
+            response = self.client.get(url)
+            seen.extend(row["id"] for row in response.data["results"])
+            self.assertLessEqual(len(seen), 2607)  # An offset-based cursor repeats rows forever
+            url = response.data["next"]
+
+        self.assertEqual(len(seen), 2607)
+        self.assertEqual(seen, list(WarehouseStockHistory.objects.order_by("-timestamp", "-id").values_list("id", flat=True)))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse("warehouse-stock-history-list"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(AUDITLOG_MAX_PAGE_SIZE=4)
+    def test_page_size_is_capped(self):
+        response = self.client.get(reverse("warehouse-stock-history-list"), {"page_size": 100})
+        self.assertEqual(len(response.data["results"]), 4)
+
+    def test_page_numbers_are_still_available(self):
+        response = self.client.get(reverse("warehouse-stock-history-list"), {"page": 2, "page_size": 5})
+        self.assertEqual(response.data["count"], 7)
+        self.assertEqual(len(response.data["results"]), 2)
+
+
+class ArchiveAuditlogTest(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.old = [now - timedelta(days=400), now - timedelta(days=430)]
+        for moment in self.old + [now]:
+            WarehouseStockHistory.objects.create(
+                warehouse_name="Main", products={}, quantities={}, action="updated", timestamp=moment
+            )
+
+    def test_old_months_are_archived_then_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("archive_auditlog", retention_months=12, output_dir=directory, stdout=StringIO())
+            files = sorted(Path(directory).glob("auditlog_warehousestockhistory_*.jsonl.gz"))
+            rows = [json.loads(line) for path in files for line in gzip.open(path, "rt")]
+
+        self.assertEqual(len(files), len({(moment.year, moment.month) for moment in self.old}))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(WarehouseStockHistory.objects.count(), 1)
+
+    def test_late_rows_get_their_own_archive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("archive_auditlog", retention_months=12, output_dir=directory, stdout=StringIO())
+            WarehouseStockHistory.objects.create(
+                warehouse_name="Late", products={}, quantities={}, action="updated", timestamp=self.old[0]
+            )
+            call_command("archive_auditlog", retention_months=12, output_dir=directory, stdout=StringIO())
+            files = sorted(Path(directory).glob("auditlog_warehousestockhistory_*.jsonl.gz"))
+            rows = [json.loads(line) for path in files for line in gzip.open(path, "rt")]
+
+        self.assertEqual(len(files), len({(moment.year, moment.month) for moment in self.old}) + 1)
+        self.assertEqual(sorted(row["warehouse_name"] for row in rows), ["Late", "Main", "Main"])
+        self.assertEqual(WarehouseStockHistory.objects.count(), 1)
+
+    def test_dry_run_keeps_everything(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("archive_auditlog", output_dir=directory, dry_run=True, stdout=StringIO())
+            self.assertEqual(list(Path(directory).iterdir()), [])
+        self.assertEqual(WarehouseStockHistory.objects.count(), 3)
+
+
+class OrderHistoryLineTest(TestCase):
+    def setUp(self):
+        tools = Category.objects.create(name="Tools", description="Hand tools")
+        paint = Category.objects.create(name="Paint", description="Paint")
+        self.hammer = Product.objects.create(name="Hammer", category=tools, unit_price="10.00")
+        self.brush = Product.objects.create(name="Brush", category=paint, unit_price="3.00")
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order = PurchaseOrder.objects.create(created_by=user)
+            PurchaseOrderItem.objects.create(purchase_order=self.order, product=self.hammer, quantity=2)
+            self.order.status = "approved"
+            self.order.save()
+            self.other = PurchaseOrder.objects.create(created_by=user)
+            PurchaseOrderItem.objects.create(purchase_order=self.other, product=self.brush, quantity=5)
+            self.other.status = "approved"
+            self.other.save()
+
+    def filtered(self, **params):
+        return PurchaseOrderHistoryFilter(params, queryset=PurchaseOrderHistory.objects.all()).qs
+
+    def test_lines_capture_product_and_price(self):
+        line = OrderHistoryLine.objects.get(product=self.hammer)
+        self.assertEqual((line.order_type, line.order_id, line.quantity, str(line.unit_price)), ("purchase", self.order.pk, 2, "10.00"))
+        entry = PurchaseOrderHistory.objects.get(action="status_changed", order_id=self.order.pk)
+        self.assertEqual(line.timestamp, entry.timestamp)
+
+    def test_history_filters_by_product_and_category(self):
+        self.assertEqual([entry.order_id for entry in self.filtered(product=self.hammer.id)], [self.order.pk])
+        self.assertEqual([entry.order_id for entry in self.filtered(category=self.brush.category_id)], [self.other.pk])
+
+
+class DailySalesRollupTest(WarehouseTestCase):
+    main_stock = None
+
+    def setUp(self):
+        super().setUp()
+        self.hammer = self.product
+        user = get_user_model().objects.create_user(
+            email="customer@example.com", username="customer", password="password123", role="customer"
+        )
+        self.customer = Customer.objects.create(user=user, phone_number="0")
+        self.day = timezone.make_aware(datetime(2024, 3, 5, 12))
+
+    def complete_order(self, allocations, unit_price="10.00", timestamp=None):
+        order = SalesOrder.objects.create(customer=self.customer, status="completed")
+        SalesOrderAllocation.objects.bulk_create([
+            SalesOrderAllocation(sales_order=order, product=self.hammer, warehouse_id=warehouse_id, quantity=quantity)
+            for warehouse_id, quantity in allocations
+        ])
+        self.snapshot(order.pk, sum(quantity for _, quantity in allocations), unit_price=unit_price, timestamp=timestamp)
+        return order
+
+    def snapshot(self, order_id, quantity, status="completed", unit_price="10.00", timestamp=None, order_type="sales"):
+        return OrderHistoryLine.objects.create(
+            order_type=order_type, order_id=order_id, product=self.hammer, product_name="Hammer",
+            quantity=quantity, unit_price=unit_price, status=status, timestamp=timestamp or self.day,
+        )
+
+    def rollups(self, dimension):
+        return {
+            rollup.key_id: (rollup.units, str(rollup.revenue), rollup.order_count)
+            for rollup in DailySalesRollup.objects.filter(dimension=dimension)
+        }
+
+    def test_rollups_per_dimension(self):
+        self.complete_order([(1, 3), (2, 1)])
+        self.complete_order([(2, 2)], unit_price="12.00")
+        self.assertEqual(refresh_rollups(), [self.day.date()])
+
+        self.assertEqual(self.rollups("product"), {self.hammer.id: (6, "64.00", 2)})
+        self.assertEqual(self.rollups("customer"), {self.customer.id: (6, "64.00", 2)})
+        self.assertEqual(self.rollups("warehouse"), {1: (3, "30.00", 1), 2: (3, "34.00", 2)})
+
+    def test_refresh_only_touches_new_days_and_is_idempotent(self):
+        self.complete_order([(1, 1)])
+        refresh_rollups()
+        refresh_rollups()  # Re-reads the previous run's lines, changing nothing
+        self.assertEqual(self.rollups("product"), {self.hammer.id: (1, "10.00", 1)})
+        self.assertEqual(refresh_rollups(), [])
+
+        self.complete_order([(1, 2)], timestamp=self.day + timedelta(days=1))
+        self.assertEqual(refresh_rollups(), [self.day.date() + timedelta(days=1)])
+        self.assertEqual(DailySalesRollup.objects.filter(dimension="product").count(), 2)
+
+    def test_an_order_saved_twice_as_completed_counts_once(self):
+        order = self.complete_order([(1, 2)])
+        self.snapshot(order.pk, 2, timestamp=self.day + timedelta(hours=1))
+        refresh_rollups()
+
+        self.assertEqual(self.rollups("product"), {self.hammer.id: (2, "20.00", 1)})
+
+    def test_an_order_cancelled_after_completion_is_removed_from_its_day(self):
+        order = self.complete_order([(1, 2)])
+        refresh_rollups()
+        self.snapshot(order.pk, 2, status="cancelled", timestamp=self.day + timedelta(days=2))
+
+        self.assertEqual(refresh_rollups(), [self.day.date()])
+        self.assertEqual(self.rollups("product"), {})
+
+    def test_lines_committed_behind_the_watermark_are_picked_up(self):
+        early = self.complete_order([(1, 1)])
+        self.complete_order([(1, 2)])
+        # The second order's line gets the higher id, but the first one's commits last
+        line = OrderHistoryLine.objects.get(order_id=early.pk)
+        OrderHistoryLine.objects.filter(pk=line.pk).delete()
+        refresh_rollups()
+        self.assertEqual(self.rollups("product"), {self.hammer.id: (2, "20.00", 1)})
+
+        OrderHistoryLine.objects.create(**{
+            field.attname: getattr(line, field.attname) for field in OrderHistoryLine._meta.concrete_fields
+        })
+        refresh_rollups()
+        self.assertEqual(self.rollups("product"), {self.hammer.id: (3, "30.00", 2)})
+
+    def test_purchase_rollups(self):
+        self.snapshot(1, 4, status="approved", order_type="purchase", timestamp=self.day - timedelta(days=1))
+        self.snapshot(1, 4, order_type="purchase")
+        self.snapshot(2, 1, unit_price="8.00", order_type="purchase")
+        refresh_rollups()
+
+        self.assertEqual(
+            [(rollup.key_id, rollup.units, str(rollup.cost), rollup.order_count) for rollup in DailyPurchaseRollup.objects.filter(day=self.day.date())],
+            [(self.hammer.id, 5, "48.00", 2)],
+        )
+        self.assertFalse(DailyPurchaseRollup.objects.exclude(day=self.day.date()).exists())
+
+    def test_rollup_endpoint(self):
+        self.complete_order([(1, 1)])
+        refresh_rollups()
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+        client = APIClient()
+        client.force_authenticate(staff)
+
+        response = client.get(reverse("product-sales-rollup-list"), {"day_after": "2024-03-01", "day_before": "2024-03-31"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["units"], 1)
+
+
+class HistoryExportTest(TestCase):
+    def setUp(self):
+        for day in (1, 2, 3):
+            WarehouseStockHistory.objects.create(
+                warehouse_name="Main" if day < 3 else "Branch", products={"1": "Hammer"}, quantities={"1": day},
+                action="updated", timestamp=timezone.make_aware(datetime(2024, 1, day)),
+            )
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+
+    def export(self, export_format, **params):
+        response = self.client.get(reverse("warehouse-stock-history-export", args=[export_format]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_export_uses_list_filters(self):
+        rows = [json.loads(line) for line in self.export("ndjson", warehouse_name="main").splitlines()]
+        self.assertEqual([row["quantities"] for row in rows], [{"1": 1}, {"1": 2}])
+
+    def test_csv_export(self):
+        lines = self.export("csv", timestamp_after="2024-01-02T00:00:00").splitlines()
+        self.assertEqual(lines[0], "id,warehouse_name,products,quantities,action,timestamp")
+        self.assertEqual(len(lines), 3)
+
+
+class OrderHistoryQueryBudgetTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Tools", description="Hand tools")
+        self.user = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+
+    def approval_queries(self, item_count):
+        order = PurchaseOrder.objects.create(created_by=self.user)
+        for i in range(item_count):
+            product = Product.objects.create(name=f"Product {i}", category=self.category, unit_price="1.00")
+            PurchaseOrderItem.objects.create(purchase_order=order, product=product, quantity=1)
+        order = PurchaseOrder.objects.select_related("created_by").get(pk=order.pk)
+
+        order.status = "approved"
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True):
+                order.save()
+        return len(context)
+
+    def test_status_change_audit_cost_does_not_grow_with_items(self):
+        self.assertEqual(self.approval_queries(1), self.approval_queries(5))
+
+    def test_entry_uses_the_items_loaded_for_the_audit(self):
+        order = PurchaseOrder.objects.create(created_by=self.user)
+        product = Product.objects.create(name="Hammer", category=self.category, unit_price="2.50")
+        PurchaseOrderItem.objects.create(purchase_order=order, product=product, quantity=4)
+        order = PurchaseOrder.objects.select_related("created_by").get(pk=order.pk)
+
+        order.status = "approved"
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(order.total_amount, 10)
+            self.assertEqual([item.product.name for item in order.items.all()], ["Hammer"])
+
+        entry = PurchaseOrderHistory.objects.get(order_id=order.pk, action="status_changed")
+        self.assertEqual((entry.products, entry.quantities, entry.total_amount), (["Hammer"], [4], 10))
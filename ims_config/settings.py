@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 from datetime import timedelta
 import os
 
@@ -66,6 +66,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "auditlog.buffer.AuditBufferMiddleware",
 ]
 
 ROOT_URLCONF = "ims_config.urls"
@@ -163,7 +164,7 @@ AUTH_USER_MODEL = "users.CustomUser"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",  # request.user from token claims, no user query
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
@@ -174,8 +175,43 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=10),
+    "TOKEN_OBTAIN_SERIALIZER": "users.authentication.ClaimsTokenObtainPairSerializer",
 }
 
+# Seconds a process trusts its last look at a user's is_active/role before checking again
+JWT_USER_STATE_TTL = config("JWT_USER_STATE_TTL", default=30, cast=int)
+
+# Which warehouses approved sales orders are fulfilled from (see orders/allocation.py):
+# "largest_first", "fewest_warehouses" or "home_warehouse"
+SALES_ORDER_ALLOCATION_STRATEGY = config("SALES_ORDER_ALLOCATION_STRATEGY", default="largest_first")
+SALES_ORDER_HOME_WAREHOUSE_ID = config("SALES_ORDER_HOME_WAREHOUSE_ID", default=1, cast=int)
+
+# Transactional outbox (auditlog/outbox.py), drained by `python manage.py relay_outbox`.
+# Comma-separated sink classes, e.g. "auditlog.outbox.FileSink,auditlog.outbox.WebhookSink".
+# Including "auditlog.outbox.AuditTableSink" moves audit history writes off the request path.
+OUTBOX_SINKS = config("OUTBOX_SINKS", default="", cast=Csv())
+OUTBOX_FILE_PATH = config("OUTBOX_FILE_PATH", default=str(BASE_DIR / "outbox.jsonl"))
+OUTBOX_WEBHOOK_URL = config("OUTBOX_WEBHOOK_URL", default="")
+# Topic prefixes each sink is sent, e.g. "auditlog.salesorderhistory"; empty means every topic.
+OUTBOX_FILE_TOPICS = config("OUTBOX_FILE_TOPICS", default="", cast=Csv())
+OUTBOX_WEBHOOK_TOPICS = config("OUTBOX_WEBHOOK_TOPICS", default="", cast=Csv())
+# Events that failed this many times are parked; reset their `attempts` to retry them.
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", default=5, cast=int)
+
+# Audit history rows are bulk-written when the transaction (or request) ends.
+# "commit" writes them on the request thread, "thread" hands them to a background thread.
+AUDITLOG_FLUSH_MODE = config("AUDITLOG_FLUSH_MODE", default="commit")
+
+# History lists page with a cursor over (timestamp, id); `?page=` switches back to page numbers.
+# Clients may ask for `?page_size=` up to AUDITLOG_MAX_PAGE_SIZE.
+AUDITLOG_PAGE_SIZE = config("AUDITLOG_PAGE_SIZE", default=50, cast=int)
+AUDITLOG_MAX_PAGE_SIZE = config("AUDITLOG_MAX_PAGE_SIZE", default=500, cast=int)
+
+# `python manage.py archive_auditlog` moves history older than this many months (besides the
+# current one) into gzipped JSON lines files in AUDITLOG_ARCHIVE_DIR and drops it.
+AUDITLOG_RETENTION_MONTHS = config("AUDITLOG_RETENTION_MONTHS", default=12, cast=int)
+AUDITLOG_ARCHIVE_DIR = config("AUDITLOG_ARCHIVE_DIR", default=str(BASE_DIR / "archive"))
+
 # MEDIA_URL = '/media/'  # URL for accessing media files
 # MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # Directory to store media files
 
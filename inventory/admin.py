@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product, ProductImage, WarehouseStock
+from .models import Category, Product, ProductImage, ProductStockSummary, StockMovement, StockSnapshot, StockSnapshotLine, WarehouseStock
 
 # Category Admin
 @admin.register(Category)
@@ -44,3 +44,46 @@ class WarehouseStockAdmin(admin.ModelAdmin):
     search_fields = ('product__name', 'warehouse__name')  # Search by product name and warehouse name
     list_filter = ('warehouse',)  # Filter by warehouse
     ordering = ('product', 'warehouse')  # Default ordering by product and warehouse
+
+
+# Product Stock Summary Admin (maintained by inventory.stock, so read-only here)
+@admin.register(ProductStockSummary)
+class ProductStockSummaryAdmin(admin.ModelAdmin):
+    list_display = ('product', 'on_hand', 'reserved', 'available')
+    list_select_related = ('product',)
+    search_fields = ('product__name',)
+    readonly_fields = ('product', 'on_hand', 'reserved')
+
+
+# Stock Movement Admin (an append-only ledger written by inventory.stock)
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'product', 'warehouse', 'delta', 'balance', 'reason', 'reference_type', 'reference_id')
+    list_select_related = ('product', 'warehouse')
+    list_filter = ('reason', 'reference_type', 'warehouse')
+    search_fields = ('product__name', 'reference_id')
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# Stock Snapshot Admin (written by the snapshot_stock command)
+class StockSnapshotLineInline(admin.TabularInline):
+    model = StockSnapshotLine
+    readonly_fields = ('warehouse', 'product', 'quantity')
+    can_delete = False
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('taken_at', 'created_at')
+    readonly_fields = ('taken_at',)
+    inlines = [StockSnapshotLineInline]
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from inventory.models import Category, Product, ProductImage, Warehouse, WarehouseStock
+from inventory.models import Category, Product, ProductImage, ProductStockSummary, StockMovement, Warehouse, WarehouseStock
 from users.models import Supplier
 
 # Serializer for Category
@@ -75,15 +75,30 @@ class WarehouseStockSerializer(serializers.ModelSerializer):
         return representation
 
 
+class ProductStockSummarySerializer(serializers.ModelSerializer):
+    available = serializers.ReadOnlyField()
+
+    class Meta:
+        model = ProductStockSummary
+        fields = ['on_hand', 'reserved', 'available']
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = ['id', 'product', 'warehouse', 'delta', 'balance', 'reason', 'reference_type', 'reference_id', 'created_at']
+
+
 # Serializer for Product with automatic warehouse assignment to Warehouse 1
 class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, required=False)
+    stock_summary = ProductStockSummarySerializer(read_only=True)
     supplier = serializers.PrimaryKeyRelatedField(queryset=Supplier.objects.all(), required=False)
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), required=True)
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'supplier', 'category', 'unit_price', 'reorder_level', 'images']
+        fields = ['id', 'name', 'description', 'supplier', 'category', 'unit_price', 'reorder_level', 'images', 'stock_summary']
 
     # Override create method to handle warehouse stock and images
     def create(self, validated_data):
@@ -117,4 +132,13 @@ class ProductTransferSerializer(serializers.Serializer):
     def validate_quantity(self, value):
         if value <= 0:
             raise serializers.ValidationError("Quantity must be greater than zero.")
-        return value
\ No newline at end of file
+        return value
+
+class BulkProductTransferSerializer(serializers.Serializer):
+    lines = ProductTransferSerializer(many=True)
+    atomic = serializers.BooleanField(default=False)  # Fail every line if any line fails
+
+    def validate_lines(self, value):
+        if not value:
+            raise serializers.ValidationError("You must provide at least one transfer line.")
+        return value
@@ -10,6 +10,7 @@ from inventory.api.views import (
     CategoryListView,
     CategoryDetailView,
     ProductTransferView,
+    StockMovementListView,
 )
 
 urlpatterns = [
@@ -21,6 +22,8 @@ urlpatterns = [
     # Warehouse stock URLs
     path("warehouse-stocks/",WarehouseStockListView.as_view(),name="warehouse-stock-list",),
     path("warehouse-stocks/<int:pk>/",WarehouseStockDetailView.as_view(),name="warehouse-stock-detail",),
+    # Stock movement ledger URL
+    path("stock-movements/", StockMovementListView.as_view(), name="stock-movement-list"),
     # Category URLs
     path("categories/", CategoryListView.as_view(), name="category-list"),
     path("categories/<int:pk>/", CategoryDetailView.as_view(), name="category-detail"),
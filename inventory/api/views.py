@@ -1,24 +1,33 @@
 from rest_framework import generics
+from django_filters.rest_framework import DjangoFilterBackend
+from inventory.filters import StockMovementFilter
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
 
-from inventory.functions import transfer_product
+from inventory.functions import transfer_product, transfer_products
+from inventory.snapshots import stock_as_of
+from warehouse.models import Warehouse
 from django.core.exceptions import ObjectDoesNotExist
-from inventory.models import Product, WarehouseStock, Category
+from inventory.models import Product, StockMovement, WarehouseStock, Category
 from inventory.api.serializers import ( ProductSerializer,
+                                       StockMovementSerializer,
                                        WarehouseStockSerializer,
                                        CategorySerializer,
                                        ProductImageUploadSerializer,
                                        ProductImageSerializer,
-                                       ProductTransferSerializer)
+                                       ProductTransferSerializer,
+                                       BulkProductTransferSerializer)
 
 from rest_framework.permissions import IsAdminUser, AllowAny
 from orders.permissions import IsStoreAdminOrStaff
 # Product Views
 class ProductListView(generics.ListCreateAPIView):
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related("stock_summary").prefetch_related("images")
     serializer_class = ProductSerializer
     def get_permissions(self):
         if self.request.method == "POST":
@@ -28,7 +37,7 @@ class ProductListView(generics.ListCreateAPIView):
         return super().get_permissions()
     
 class ProductDetailView(generics.RetrieveUpdateAPIView):
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related("stock_summary").prefetch_related("images")
     serializer_class = ProductSerializer
     def get_permissions(self):
         if self.request.method in ["PUT", "PATCH"]:
@@ -73,7 +82,8 @@ class ProductImageUploadView(generics.CreateAPIView):
     
 # Warehouse Stock Views
 class WarehouseStockListView(generics.ListCreateAPIView):
-    queryset = WarehouseStock.objects.all()
+    # Product and warehouse names are serialized for every row, so join them in
+    queryset = WarehouseStock.objects.select_related("product", "warehouse").order_by("id")
     serializer_class = WarehouseStockSerializer
     def get_permissions(self):
         if self.request.method == "POST":
@@ -81,9 +91,58 @@ class WarehouseStockListView(generics.ListCreateAPIView):
         else:
             self.permission_classes = [IsStoreAdminOrStaff]  # Anyone can list
         return super().get_permissions()
+
+    def list(self, request, *args, **kwargs):
+        if "as_of" not in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        # Historical stock, rebuilt from the nearest snapshot plus the ledger after it
+        at = _parse_as_of(request.query_params["as_of"])
+        if at is None:
+            return Response({"as_of": "Expected an ISO date or datetime."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            warehouse_id = int(request.query_params["warehouse"]) if "warehouse" in request.query_params else None
+            product_id = int(request.query_params["product"]) if "product" in request.query_params else None
+        except ValueError:
+            return Response({"error": "warehouse and product must be IDs."}, status=status.HTTP_400_BAD_REQUEST)
+
+        balances = sorted(stock_as_of(at, warehouse_id=warehouse_id, product_id=product_id).items())
+        page = self.paginate_queryset(balances)
+        rows = page if page is not None else balances
+        warehouse_names = dict(Warehouse.objects.filter(id__in={key[0] for key, _ in rows}).values_list("id", "name"))
+        product_names = dict(Product.objects.filter(id__in={key[1] for key, _ in rows}).values_list("id", "name"))
+        data = [
+            {
+                "product": {"p_id": product_id, "p_name": product_names.get(product_id)},
+                "warehouse": {"w_id": warehouse_id, "w_name": warehouse_names.get(warehouse_id)},
+                "quantity": quantity,
+                "as_of": at,
+            }
+            for (warehouse_id, product_id), quantity in rows
+        ]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+def _parse_as_of(value):
+    """An ISO datetime, or a date meaning the end of that day; None if neither."""
+    try:
+        at = parse_datetime(value)
+        day = parse_date(value) if at is None else None
+    except ValueError:  # Well formed but not a real date
+        return None
+    if at is None:
+        if day is None:
+            return None
+        at = datetime.combine(day, time.max)
+    if timezone.is_naive(at):
+        at = timezone.make_aware(at)
+    return at
+
     
 class WarehouseStockDetailView(generics.RetrieveUpdateAPIView):
-    queryset = WarehouseStock.objects.all()
+    queryset = WarehouseStock.objects.select_related("product", "warehouse")
     serializer_class = WarehouseStockSerializer
     def get_permissions(self):
         if self.request.method in ["PUT", "PATCH"]:
@@ -92,6 +151,15 @@ class WarehouseStockDetailView(generics.RetrieveUpdateAPIView):
             self.permission_classes = [IsStoreAdminOrStaff]  # Anyone can retrieve
         return super().get_permissions()   
 
+class StockMovementListView(generics.ListAPIView):
+    """The stock ledger, newest first; filter by product, warehouse or reference."""
+    queryset = StockMovement.objects.order_by("-created_at", "-id")
+    serializer_class = StockMovementSerializer
+    permission_classes = [IsStoreAdminOrStaff]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = StockMovementFilter
+
+
 class CategoryListView(generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -119,6 +187,13 @@ class CategoryDetailView(generics.RetrieveUpdateAPIView):
 class ProductTransferView(generics.CreateAPIView):
     serializer_class = ProductTransferSerializer
     permission_classes = [IsAdminUser]
+
+    def get_serializer_class(self):
+        # A body with "lines" is a transfer document moving many products at once
+        if self.request.method == "POST" and "lines" in self.request.data:
+            return BulkProductTransferSerializer
+        return super().get_serializer_class()
+
     def get(self, request, *args, **kwargs):
         message = {
             "message": "This endpoint allows you to transfer products between warehouses.",
@@ -128,12 +203,31 @@ class ProductTransferView(generics.CreateAPIView):
                 "product_id": "The ID of the product you wish to transfer.",
                 "quantity": "The number of units of the product you wish to transfer."
             },
-            "note": "Make sure that the source warehouse has sufficient stock of the product before initiating the transfer."
+            "note": "Make sure that the source warehouse has sufficient stock of the product before initiating the transfer.",
+            "bulk": {
+                "lines": "A list of transfers with the fields above, applied in one transaction.",
+                "atomic": "If true, no line is transferred when any line fails. Defaults to false."
+            }
         }
         return Response(message, status=status.HTTP_200_OK)
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        
+
+        if isinstance(serializer, BulkProductTransferSerializer):
+            serializer.is_valid(raise_exception=True)
+            try:
+                result = transfer_products(serializer.validated_data['lines'], atomic=serializer.validated_data['atomic'])
+            except ValueError as e:
+                # Stock that changed between the per-line checks and the update fails the whole document
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if not result["failed"]:
+                response_status = status.HTTP_200_OK
+            elif result["transferred"]:
+                response_status = status.HTTP_207_MULTI_STATUS  # Some lines went through, some did not
+            else:
+                response_status = status.HTTP_400_BAD_REQUEST
+            return Response(result, status=response_status)
+
         if serializer.is_valid():
             source_warehouse_id = serializer.validated_data['source_warehouse_id']
             destination_warehouse_id = serializer.validated_data['destination_warehouse_id']
@@ -142,8 +236,8 @@ class ProductTransferView(generics.CreateAPIView):
 
             try:
                 # Call the transfer_product function
-                transfer_product(source_warehouse_id, destination_warehouse_id, product_id, quantity)
-                return Response({"message": "Product transferred successfully."}, status=status.HTTP_200_OK)
+                result = transfer_product(source_warehouse_id, destination_warehouse_id, product_id, quantity)
+                return Response(result, status=status.HTTP_200_OK)
             except ObjectDoesNotExist as e:
                 return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
             except ValueError as e:
@@ -0,0 +1,14 @@
+# filters.py
+from django_filters import rest_framework as filters
+from inventory.models import StockMovement
+
+
+class StockMovementFilter(filters.FilterSet):
+    product = filters.NumberFilter(field_name='product_id')
+    warehouse = filters.NumberFilter(field_name='warehouse_id')
+    reference_type = filters.ChoiceFilter(choices=StockMovement.REFERENCE_TYPES)
+    reference_id = filters.CharFilter(field_name='reference_id')
+
+    class Meta:
+        model = StockMovement
+        fields = ['product', 'warehouse', 'reference_type', 'reference_id']
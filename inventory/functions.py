@@ -1,57 +1,94 @@
+import uuid
+
 from django.db import transaction
-from inventory.models import WarehouseStock, Product
+from inventory.models import Product
+from inventory.stock import StockDelta, apply_stock_deltas, lock_stock
 from warehouse.models import Warehouse
 from django.core.exceptions import ObjectDoesNotExist
-from auditlog.models import WarehouseStockHistory
-from django.utils import timezone
+
 def transfer_product(source_warehouse_id, destination_warehouse_id, product_id, quantity):
     if source_warehouse_id == destination_warehouse_id:
         raise ValueError("Souce and Destination should not be equal")
-    try:
-        source_warehouse = Warehouse.objects.get(id=source_warehouse_id)
-    except Warehouse.DoesNotExist:
+
+    # Look both warehouses up in one query
+    warehouse_ids = set(
+        Warehouse.objects.filter(id__in=[source_warehouse_id, destination_warehouse_id]).values_list("id", flat=True)
+    )
+    if source_warehouse_id not in warehouse_ids:
         raise ObjectDoesNotExist(f"Source warehouse with ID {source_warehouse_id} does not exist.")
-    
-    try:
-        destination_warehouse = Warehouse.objects.get(id=destination_warehouse_id)
-    except Warehouse.DoesNotExist:
+    if destination_warehouse_id not in warehouse_ids:
         raise ObjectDoesNotExist(f"Destination warehouse with ID {destination_warehouse_id} does not exist.")
 
-    try:
-        product = Product.objects.get(id=product_id)
-    except Product.DoesNotExist:
+    if not Product.objects.filter(id=product_id).exists():
         raise ObjectDoesNotExist(f"Product with ID {product_id} does not exist.")
 
-    with transaction.atomic():  # Ensure all database operations are atomic
-        source_stock = WarehouseStock.objects.get(warehouse=source_warehouse, product=product)
-
-        if source_stock.quantity < quantity:
-            raise ValueError("Insufficient stock in the source warehouse.")
-
-        # Deduct stock from the source warehouse
-        source_stock.quantity -= quantity
-        source_stock.save()
-        WarehouseStockHistory.objects.create(
-            warehouse_name=source_warehouse.name,
-            products={product.id: product.name},
-            quantities={product.id: quantity},
-            action='transfer-out',  # Specify the transfer action
-            timestamp=timezone.now(),
-        )
-        # Add stock to the destination warehouse
-        destination_stock, created = WarehouseStock.objects.get_or_create(
-            warehouse=destination_warehouse, 
-            product=product,
-            defaults={'quantity': 0}
-        )
-        destination_stock.quantity += quantity
-        destination_stock.save()
-        
-        WarehouseStockHistory.objects.create(
-                warehouse_name=destination_warehouse.name,
-                products={product.id: product.name},
-                quantities={product.id: quantity},
-                action='transfer-in',  # Specify the transfer action
-                timestamp=timezone.now(),
-            )
-    return {"message": "Product transferred successfully."}
+    # Both rows are locked and changed together; raises InsufficientStock (a ValueError)
+    reference = uuid.uuid4().hex  # Ties the two ledger movements together
+    apply_stock_deltas([
+        StockDelta(source_warehouse_id, product_id, -quantity, "transfer-out", "transfer", reference),
+        StockDelta(destination_warehouse_id, product_id, quantity, "transfer-in", "transfer", reference),
+    ])
+    return {"message": "Product transferred successfully.", "reference": reference}
+
+
+def transfer_products(lines, atomic=False):
+    """
+    Transfer many products in one transaction.
+
+    `lines` is a list of dicts with the same keys as transfer_product's arguments.
+    Every line is checked against the locked stock in order; lines that cannot be
+    applied are reported in "failed" and the rest are applied with a single set-based
+    update. With atomic=True nothing is applied if any line fails. All movements of
+    the batch share one ledger reference.
+    """
+    warehouse_ids = set(Warehouse.objects.filter(
+        id__in={line["source_warehouse_id"] for line in lines} | {line["destination_warehouse_id"] for line in lines}
+    ).values_list("id", flat=True))
+    product_ids = set(Product.objects.filter(
+        id__in={line["product_id"] for line in lines}
+    ).values_list("id", flat=True))
+
+    failed = []
+    valid = []
+    for index, line in enumerate(lines):
+        if line["source_warehouse_id"] == line["destination_warehouse_id"]:
+            failed.append({"line": index, "error": "Souce and Destination should not be equal"})
+        elif line["source_warehouse_id"] not in warehouse_ids:
+            failed.append({"line": index, "error": f"Source warehouse with ID {line['source_warehouse_id']} does not exist."})
+        elif line["destination_warehouse_id"] not in warehouse_ids:
+            failed.append({"line": index, "error": f"Destination warehouse with ID {line['destination_warehouse_id']} does not exist."})
+        elif line["product_id"] not in product_ids:
+            failed.append({"line": index, "error": f"Product with ID {line['product_id']} does not exist."})
+        else:
+            valid.append((index, line))
+
+    transferred = []
+    reference = uuid.uuid4().hex
+    with transaction.atomic():
+        keys = set()
+        for _, line in valid:
+            keys.add((line["source_warehouse_id"], line["product_id"]))
+            keys.add((line["destination_warehouse_id"], line["product_id"]))
+        available = {key: stock.quantity for key, stock in lock_stock(keys=sorted(keys)).items()}
+
+        deltas = []
+        for index, line in valid:
+            source = (line["source_warehouse_id"], line["product_id"])
+            destination = (line["destination_warehouse_id"], line["product_id"])
+            quantity = line["quantity"]
+            if available.get(source, 0) < quantity:
+                failed.append({"line": index, "error": "Insufficient stock in the source warehouse."})
+                continue
+            available[source] -= quantity
+            available[destination] = available.get(destination, 0) + quantity
+            deltas.append(StockDelta(*source, -quantity, "transfer-out", "transfer", reference))
+            deltas.append(StockDelta(*destination, quantity, "transfer-in", "transfer", reference))
+            transferred.append(index)
+
+        if atomic and failed:
+            transferred = []
+        else:
+            apply_stock_deltas(deltas)
+
+    failed.sort(key=lambda failure: failure["line"])
+    return {"transferred": transferred, "failed": failed, "reference": reference if transferred else None}
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from inventory.snapshots import take_stock_snapshot
+
+
+class Command(BaseCommand):
+    help = "Write a stock snapshot checkpoint for point-in-time stock queries. Run it periodically, e.g. nightly."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--at", help="ISO datetime to snapshot (default: a minute ago).")
+
+    def handle(self, *args, **options):
+        at = None
+        if options["at"]:
+            at = parse_datetime(options["at"])
+            if at is None:
+                raise CommandError(f"Invalid datetime '{options['at']}'.")
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        snapshot = take_stock_snapshot(at)
+        self.stdout.write(self.style.SUCCESS(f"{snapshot} with {snapshot.lines.count()} stock lines."))
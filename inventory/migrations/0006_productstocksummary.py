@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_stock_summaries(apps, schema_editor):
+    Product = apps.get_model("inventory", "Product")
+    ProductStockSummary = apps.get_model("inventory", "ProductStockSummary")
+    totals = Product.objects.annotate(total=Sum("stocks__quantity")).values_list("id", "total")
+    ProductStockSummary.objects.bulk_create(
+        [ProductStockSummary(product_id=product_id, on_hand=total or 0) for product_id, total in totals],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_alter_productimage_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStockSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_summary', serialize=False, to='inventory.product', verbose_name='Product')),
+                ('on_hand', models.PositiveIntegerField(default=0, verbose_name='On Hand')),
+                ('reserved', models.PositiveIntegerField(default=0, verbose_name='Reserved')),
+            ],
+            options={
+                'verbose_name': 'Product Stock Summary',
+                'verbose_name_plural': 'Product Stock Summaries',
+            },
+        ),
+        migrations.AlterField(
+            model_name='warehousestock',
+            name='quantity',
+            field=models.PositiveIntegerField(default=0, verbose_name='Quantity'),
+        ),
+        migrations.RunPython(backfill_stock_summaries, migrations.RunPython.noop),
+    ]
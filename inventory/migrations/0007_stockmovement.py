@@ -0,0 +1,54 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_opening_balances(apps, schema_editor):
+    WarehouseStock = apps.get_model("inventory", "WarehouseStock")
+    StockMovement = apps.get_model("inventory", "StockMovement")
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                warehouse_id=stock.warehouse_id,
+                product_id=stock.product_id,
+                delta=stock.quantity,
+                balance=stock.quantity,
+                reason="opening-balance",
+            )
+            for stock in WarehouseStock.objects.iterator(chunk_size=1000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_productstocksummary'),
+        ('warehouse', '0003_alter_warehouse_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField(verbose_name='Change')),
+                ('balance', models.PositiveIntegerField(verbose_name='Balance After')),
+                ('reason', models.CharField(max_length=50, verbose_name='Reason')),
+                ('reference_type', models.CharField(blank=True, choices=[('', 'None'), ('sales_order', 'Sales Order'), ('purchase_order', 'Purchase Order'), ('transfer', 'Transfer')], default='', max_length=20)),
+                ('reference_id', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='inventory.product', verbose_name='Product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='warehouse.warehouse', verbose_name='Warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Movement',
+                'verbose_name_plural': 'Stock Movements',
+                'indexes': [models.Index(fields=['product', 'warehouse', 'created_at'], name='inventory_s_product_854de5_idx'), models.Index(fields=['warehouse', 'created_at'], name='inventory_s_warehou_f752ce_idx'), models.Index(fields=['reference_type', 'reference_id'], name='inventory_s_referen_5aaa1a_idx')],
+            },
+        ),
+        migrations.RunPython(create_opening_balances, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from warehouse.models import Warehouse
 from users.models import Supplier
 from cloudinary.models import CloudinaryField
@@ -68,3 +69,78 @@ class WarehouseStock(models.Model):
 
     def __str__(self):
         return f"{self.product.name} - {self.quantity} units in {self.warehouse.name}"
+
+
+class ProductStockSummary(models.Model):
+    """Total stock of a product across all warehouses, kept up to date by inventory.stock."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="stock_summary", verbose_name="Product")
+    on_hand = models.PositiveIntegerField(default=0, verbose_name="On Hand")
+    reserved = models.PositiveIntegerField(default=0, verbose_name="Reserved")
+
+    class Meta:
+        verbose_name = "Product Stock Summary"
+        verbose_name_plural = "Product Stock Summaries"
+
+    def __str__(self):
+        return f"{self.product_id} - {self.on_hand} on hand, {self.reserved} reserved"
+
+    @property
+    def available(self):
+        return self.on_hand - self.reserved
+
+
+class StockMovement(models.Model):
+    """One signed change to a warehouse's stock of a product, with the balance it left behind."""
+    REFERENCE_TYPES = [
+        ("", "None"),
+        ("sales_order", "Sales Order"),
+        ("purchase_order", "Purchase Order"),
+        ("transfer", "Transfer"),
+    ]
+
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="stock_movements", verbose_name="Warehouse")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_movements", verbose_name="Product")
+    delta = models.IntegerField(verbose_name="Change")
+    balance = models.PositiveIntegerField(verbose_name="Balance After")
+    reason = models.CharField(max_length=50, verbose_name="Reason")
+    reference_type = models.CharField(max_length=20, choices=REFERENCE_TYPES, blank=True, default="")
+    reference_id = models.CharField(max_length=64, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Stock Movement"
+        verbose_name_plural = "Stock Movements"
+        indexes = [
+            models.Index(fields=["product", "warehouse", "created_at"]),
+            models.Index(fields=["warehouse", "created_at"]),
+            models.Index(fields=["reference_type", "reference_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.delta:+d} of product {self.product_id} in warehouse {self.warehouse_id} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """A checkpoint of every warehouse's stock as of `taken_at`, used to answer point-in-time queries."""
+    taken_at = models.DateTimeField(unique=True, verbose_name="Taken At")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Stock Snapshot"
+        verbose_name_plural = "Stock Snapshots"
+        ordering = ["-taken_at"]
+
+    def __str__(self):
+        return f"Stock snapshot as of {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class StockSnapshotLine(models.Model):
+    snapshot = models.ForeignKey(StockSnapshot, on_delete=models.CASCADE, related_name="lines")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="+")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["snapshot", "warehouse", "product"], name="unique_snapshot_stock_line"),
+        ]
@@ -1,4 +1,5 @@
-from django.db.models.signals import post_save
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from orders.models import PurchaseOrder, PurchaseOrderItem
 from inventory.models import WarehouseStock
@@ -6,6 +7,7 @@ from warehouse.models import Warehouse  # Assuming the Warehouse model is in the
 
 from django.core.mail import send_mail
 from inventory.models import WarehouseStock
+from inventory.stock import record_adjustment, refresh_stock_summary
 
 @receiver(post_save, sender=PurchaseOrder)
 def update_warehouse_stock(sender, instance, **kwargs):
@@ -32,4 +34,22 @@ def update_warehouse_stock(sender, instance, **kwargs):
         print(f"Stock updated for Purchase Order {instance.id} in warehouse {warehouse.id}")
 
 
-
+# apply_stock_deltas keeps ProductStockSummary and the StockMovement ledger current itself;
+# these cover admin and API edits
+@receiver(post_save, sender=WarehouseStock)
+def refresh_summary_on_stock_save(sender, instance, created, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    refresh_stock_summary(instance.product_id)
+    record_adjustment(instance, "created" if created else "adjustment")
+
+
+@receiver(post_delete, sender=WarehouseStock)
+def refresh_summary_on_stock_delete(sender, instance, origin=None, **kwargs):
+    # Never create a summary here: the product itself may be in the middle of being deleted
+    refresh_stock_summary(instance.product_id, create=False)
+    # Close the row's ledger at zero, unless a product or warehouse deletion is taking
+    # its movements along with it
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is WarehouseStock:
+        record_adjustment(instance, "deleted", quantity=0)
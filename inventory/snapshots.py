@@ -0,0 +1,85 @@
+"""
+Point-in-time stock.
+
+A StockSnapshot holds every (warehouse, product) balance as of `taken_at`. Stock on
+any earlier or later date is the nearest snapshot at or before it plus the
+StockMovement deltas between the two, so a query never replays more than one
+snapshot interval of the ledger.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from inventory.models import StockMovement, StockSnapshot, StockSnapshotLine
+
+# Movements are stamped before their transaction commits; snapshotting slightly in the
+# past keeps a late commit from landing behind a checkpoint that has already been taken
+SNAPSHOT_SETTLE_TIME = timedelta(minutes=1)
+
+
+def _movement_totals(after, until, warehouse_id=None, product_id=None):
+    """Net ledger change per (warehouse_id, product_id) in the window (after, until]."""
+    movements = StockMovement.objects.filter(created_at__lte=until)
+    if after is not None:
+        movements = movements.filter(created_at__gt=after)
+    if warehouse_id is not None:
+        movements = movements.filter(warehouse_id=warehouse_id)
+    if product_id is not None:
+        movements = movements.filter(product_id=product_id)
+    rows = movements.values_list("warehouse_id", "product_id").annotate(total=Sum("delta")).order_by()
+    return {(warehouse_id, product_id): total for warehouse_id, product_id, total in rows}
+
+
+def stock_as_of(at, warehouse_id=None, product_id=None):
+    """
+    Rebuild stock balances as of `at`, optionally for one warehouse and/or product.
+
+    Costs one snapshot lookup, one read of its lines and one aggregate over the
+    movements recorded after it. Returns {(warehouse_id, product_id): quantity},
+    leaving out rows that were empty at the time.
+    """
+    snapshot = StockSnapshot.objects.filter(taken_at__lte=at).order_by("-taken_at").first()
+
+    balances = {}
+    if snapshot is not None:
+        lines = snapshot.lines.all()
+        if warehouse_id is not None:
+            lines = lines.filter(warehouse_id=warehouse_id)
+        if product_id is not None:
+            lines = lines.filter(product_id=product_id)
+        balances = {
+            (line_warehouse_id, line_product_id): quantity
+            for line_warehouse_id, line_product_id, quantity in lines.values_list("warehouse_id", "product_id", "quantity")
+        }
+
+    after = snapshot.taken_at if snapshot is not None else None
+    for key, total in _movement_totals(after, at, warehouse_id, product_id).items():
+        balances[key] = balances.get(key, 0) + total
+    return {key: quantity for key, quantity in balances.items() if quantity > 0}
+
+
+def take_stock_snapshot(at=None):
+    """
+    Write a snapshot as of `at` (default: now minus SNAPSHOT_SETTLE_TIME) from the
+    previous snapshot plus the movements since, and return it. Taking one for a
+    time that already has a snapshot returns the existing one.
+    """
+    at = at or timezone.now() - SNAPSHOT_SETTLE_TIME
+    existing = StockSnapshot.objects.filter(taken_at=at).first()
+    if existing is not None:
+        return existing
+
+    # Rebuilt before the new snapshot exists, so it starts from the previous one
+    balances = stock_as_of(at)
+    with transaction.atomic():
+        snapshot = StockSnapshot.objects.create(taken_at=at)
+        StockSnapshotLine.objects.bulk_create(
+            [
+                StockSnapshotLine(snapshot=snapshot, warehouse_id=warehouse_id, product_id=product_id, quantity=quantity)
+                for (warehouse_id, product_id), quantity in sorted(balances.items())
+            ],
+            batch_size=1000,
+        )
+    return snapshot
@@ -0,0 +1,240 @@
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from inventory.models import WarehouseStock, Product, ProductStockSummary, StockMovement
+from warehouse.models import Warehouse
+from auditlog.models import WarehouseStockHistory
+from auditlog.outbox import record_history
+
+# Purchase orders are received into and cancellations are returned to this warehouse
+DEFAULT_WAREHOUSE_ID = 1
+
+# A signed change to one (warehouse, product) stock row; `action` is what gets logged and
+# the optional reference points the StockMovement at the order or transfer behind it
+StockDelta = namedtuple(
+    "StockDelta",
+    ["warehouse_id", "product_id", "quantity", "action", "reference_type", "reference_id"],
+    defaults=("", ""),
+)
+
+
+class InsufficientStock(ValueError):
+    """Raised when a delta would take a WarehouseStock quantity below zero."""
+
+
+def _stock_keys_filter(keys):
+    query = Q()
+    for warehouse_id, product_id in keys:
+        query |= Q(warehouse_id=warehouse_id, product_id=product_id)
+    return query
+
+
+def lock_stock(keys=None, product_ids=None):
+    """
+    Lock WarehouseStock rows with SELECT ... FOR UPDATE and return them keyed by
+    (warehouse_id, product_id). Rows are always locked in (warehouse_id, product_id)
+    order so concurrent callers cannot deadlock each other. Must run inside a transaction.
+    """
+    queryset = WarehouseStock.objects.select_for_update()
+    if keys is not None:
+        if not keys:
+            return {}
+        queryset = queryset.filter(_stock_keys_filter(keys))
+    if product_ids is not None:
+        queryset = queryset.filter(product_id__in=product_ids)
+    queryset = queryset.order_by("warehouse_id", "product_id")
+    return {(stock.warehouse_id, stock.product_id): stock for stock in queryset}
+
+
+def apply_stock_deltas(deltas):
+    """
+    Apply a batch of StockDelta changes atomically.
+
+    All affected rows are locked in a deterministic order, checked against the locked
+    quantities and then changed with a single conditional F() update, so concurrent
+    writers can neither oversell nor lose each other's updates. One WarehouseStockHistory
+    row is written per delta. Raises InsufficientStock and leaves stock untouched if any
+    row would go negative.
+    """
+    deltas = [delta for delta in deltas if delta.quantity]
+    if not deltas:
+        return {}
+
+    net_changes = {}
+    for delta in deltas:
+        key = (delta.warehouse_id, delta.product_id)
+        net_changes[key] = net_changes.get(key, 0) + delta.quantity
+    keys = sorted(net_changes)
+
+    with transaction.atomic():
+        locked = lock_stock(keys=keys)
+
+        # Rows that receive stock may not exist yet, even when the batch nets them back to
+        # zero (a round trip through a warehouse); create them empty and lock them too
+        missing = [key for key in keys if key not in locked and net_changes[key] >= 0]
+        if missing:
+            WarehouseStock.objects.bulk_create(
+                [WarehouseStock(warehouse_id=w_id, product_id=p_id, quantity=0) for w_id, p_id in missing],
+                ignore_conflicts=True,
+            )
+            locked.update(lock_stock(keys=missing))
+
+        for key in keys:
+            available = locked[key].quantity if key in locked else 0
+            if available + net_changes[key] < 0:
+                warehouse_id, product_id = key
+                raise InsufficientStock(
+                    f"Insufficient stock for product {product_id} in warehouse {warehouse_id}. "
+                    f"Available: {available}, Required: {-net_changes[key]}"
+                )
+
+        # One UPDATE for every row; the per-row WHERE guards against going negative
+        condition = Q()
+        whens = []
+        for key in keys:
+            stock = locked[key]
+            change = net_changes[key]
+            if change < 0:
+                condition |= Q(pk=stock.pk, quantity__gte=-change)
+            else:
+                condition |= Q(pk=stock.pk)
+            whens.append(When(pk=stock.pk, then=Value(change)))
+        updated = WarehouseStock.objects.filter(condition).update(
+            quantity=F("quantity") + Case(*whens, default=Value(0))
+        )
+        if updated != len(keys):
+            raise InsufficientStock("Stock changed while it was being updated.")
+
+        _update_stock_summaries(net_changes)
+        _record_movements(deltas, {key: locked[key].quantity for key in keys})
+        _log_stock_deltas(deltas)
+
+    return {key: locked[key].quantity + change for key, change in net_changes.items()}
+
+
+def _update_stock_summaries(net_changes):
+    product_changes = {}
+    for (_, product_id), change in net_changes.items():
+        product_changes[product_id] = product_changes.get(product_id, 0) + change
+    product_changes = {product_id: change for product_id, change in product_changes.items() if change}
+    if not product_changes:
+        return
+
+    product_ids = sorted(product_changes)
+    ProductStockSummary.objects.bulk_create(
+        [ProductStockSummary(product_id=product_id) for product_id in product_ids],
+        ignore_conflicts=True,
+    )
+    # Lock the summaries in product order, like the stock rows above
+    list(ProductStockSummary.objects.select_for_update().filter(product_id__in=product_ids).order_by("product_id").values_list("pk"))
+    ProductStockSummary.objects.filter(product_id__in=product_ids).update(
+        on_hand=F("on_hand") + Case(
+            *[When(product_id=product_id, then=Value(change)) for product_id, change in product_changes.items()],
+            default=Value(0),
+        )
+    )
+
+
+def refresh_stock_summary(product_id, create=True):
+    """
+    Recompute a product's summary from its WarehouseStock rows, for edits made outside
+    apply_stock_deltas.
+
+    The summary row is locked before the rows are summed, so a concurrent
+    apply_stock_deltas either commits first and is counted, or adds its change to
+    the recomputed value afterwards.
+    """
+    with transaction.atomic():
+        if create:
+            ProductStockSummary.objects.bulk_create([ProductStockSummary(product_id=product_id)], ignore_conflicts=True)
+        if not list(ProductStockSummary.objects.select_for_update().filter(product_id=product_id).values_list("pk")):
+            return
+        on_hand = WarehouseStock.objects.filter(product_id=product_id).aggregate(total=Sum("quantity"))["total"] or 0
+        ProductStockSummary.objects.filter(product_id=product_id).update(on_hand=on_hand)
+
+
+def check_availability(quantities):
+    """
+    Raise InsufficientStock unless every product in `quantities` ({product_id: quantity})
+    has enough available stock. Reads all products' summaries in one query.
+    """
+    summaries = ProductStockSummary.objects.filter(product_id__in=quantities).in_bulk()
+    for product_id, quantity_needed in quantities.items():
+        summary = summaries.get(product_id)
+        available = summary.available if summary else 0
+        if available < quantity_needed:
+            raise InsufficientStock(
+                f"Insufficient stock for product {product_id}. Available: {available}, Required: {quantity_needed}"
+            )
+
+
+def _record_movements(deltas, balances):
+    """
+    Append one StockMovement per delta to the ledger, with the running balance after it.
+
+    Only the batch's net change is checked against stock, so a row may be issued
+    before it is received within one batch. Each row's receipts are recorded before
+    its issues (otherwise in batch order), which keeps every running balance real and
+    never below zero.
+    """
+    now = timezone.now()
+    movements = []
+    for delta in sorted(deltas, key=lambda delta: delta.quantity < 0):
+        key = (delta.warehouse_id, delta.product_id)
+        balances[key] += delta.quantity
+        movements.append(StockMovement(
+            warehouse_id=delta.warehouse_id,
+            product_id=delta.product_id,
+            delta=delta.quantity,
+            balance=balances[key],
+            reason=delta.action,
+            reference_type=delta.reference_type,
+            reference_id=str(delta.reference_id),
+            created_at=now,
+        ))
+    StockMovement.objects.bulk_create(movements)
+
+
+def record_adjustment(stock, reason, quantity=None):
+    """
+    Ledger entry for a WarehouseStock row saved directly (admin, stock API), based on
+    the last balance. `quantity` overrides the row's, e.g. 0 for a deleted row.
+    """
+    quantity = stock.quantity if quantity is None else quantity
+    last = (
+        StockMovement.objects.filter(warehouse_id=stock.warehouse_id, product_id=stock.product_id)
+        .order_by("-created_at", "-id")
+        .values_list("balance", flat=True)
+        .first()
+    ) or 0
+    if quantity != last:
+        StockMovement.objects.create(
+            warehouse_id=stock.warehouse_id,
+            product_id=stock.product_id,
+            delta=quantity - last,
+            balance=quantity,
+            reason=reason,
+        )
+
+
+def _log_stock_deltas(deltas):
+    warehouse_names = dict(
+        Warehouse.objects.filter(id__in={delta.warehouse_id for delta in deltas}).values_list("id", "name")
+    )
+    product_names = dict(
+        Product.objects.filter(id__in={delta.product_id for delta in deltas}).values_list("id", "name")
+    )
+    now = timezone.now()
+    record_history(WarehouseStockHistory, [
+        dict(
+            warehouse_name=warehouse_names.get(delta.warehouse_id, ""),
+            products={delta.product_id: product_names.get(delta.product_id, "")},
+            quantities={delta.product_id: abs(delta.quantity)},
+            action=delta.action,
+            timestamp=now,
+        )
+        for delta in deltas
+    ])
@@ -1,3 +1,337 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from django.core.exceptions import ObjectDoesNotExist
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from inventory.models import Category, Product, ProductStockSummary, StockMovement, StockSnapshot, WarehouseStock
+from inventory.functions import transfer_product, transfer_products
+from inventory.stock import StockDelta, InsufficientStock, apply_stock_deltas, check_availability
+from inventory.snapshots import stock_as_of, take_stock_snapshot
+from warehouse.models import Warehouse
+from auditlog.models import WarehouseStockHistory
+
+
+class WarehouseTestCase(TestCase):
+    """The Main (id 1) and Branch (id 2) warehouses and a Hammer in Tools, `main_stock` of it in Main."""
+    main_stock = 10
+
+    def setUp(self):
+        self.main = Warehouse.objects.create(id=1, name="Main", address="Street 1", country="Ethiopia")
+        self.branch = Warehouse.objects.create(id=2, name="Branch", address="Street 2", country="Ethiopia")
+        self.category = Category.objects.create(name="Tools", description="Hand tools")
+        self.product = Product.objects.create(name="Hammer", category=self.category, unit_price="10.00")
+        if self.main_stock is not None:
+            WarehouseStock.objects.create(product=self.product, warehouse=self.main, quantity=self.main_stock)
+
+
+class StockServiceTest(WarehouseTestCase):
+    def test_transfer_moves_stock_and_logs_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            transfer_product(self.main.id, self.branch.id, self.product.id, 4)
+
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.product).quantity, 6)
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.branch, product=self.product).quantity, 4)
+        self.assertEqual(
+            sorted(WarehouseStockHistory.objects.filter(action__startswith="transfer").values_list("action", flat=True)),
+            ["transfer-in", "transfer-out"],
+        )
+
+    def test_transfer_rejects_overselling(self):
+        with self.assertRaises(InsufficientStock):
+            transfer_product(self.main.id, self.branch.id, self.product.id, 11)
+
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.product).quantity, 10)
+        self.assertFalse(WarehouseStock.objects.filter(warehouse=self.branch).exists())
+
+    def test_transfer_unknown_warehouse(self):
+        with self.assertRaises(ObjectDoesNotExist):
+            transfer_product(self.main.id, 99, self.product.id, 1)
+
+    def test_deltas_are_netted_per_row(self):
+        apply_stock_deltas([
+            StockDelta(self.main.id, self.product.id, -10, "sales-out"),
+            StockDelta(self.main.id, self.product.id, 3, "sales-return"),
+        ])
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.product).quantity, 3)
+
+
+    def test_round_trip_through_a_warehouse_without_a_stock_row(self):
+        result = transfer_products([
+            {"source_warehouse_id": 1, "destination_warehouse_id": 2, "product_id": self.product.id, "quantity": 4},
+            {"source_warehouse_id": 2, "destination_warehouse_id": 1, "product_id": self.product.id, "quantity": 4},
+        ])
+
+        self.assertEqual(result["transferred"], [0, 1])
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.product).quantity, 10)
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.branch, product=self.product).quantity, 0)
+        self.assertEqual(StockMovement.objects.filter(reference_id=result["reference"]).count(), 4)
+
+
+class BulkProductTransferTest(WarehouseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = self.product
+        self.saw = Product.objects.create(name="Saw", category=self.category, unit_price="20.00")
+        WarehouseStock.objects.create(product=self.saw, warehouse=self.main, quantity=2)
+
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", username="admin", password="adminpassword123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.url = reverse("product-transfer")
+
+    def lines(self):
+        return [
+            {"source_warehouse_id": 1, "destination_warehouse_id": 2, "product_id": self.hammer.id, "quantity": 5},
+            {"source_warehouse_id": 1, "destination_warehouse_id": 2, "product_id": self.saw.id, "quantity": 3},
+        ]
+
+    def test_partial_transfer_reports_failed_lines(self):
+        response = self.client.post(self.url, {"lines": self.lines()}, format="json")
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data["transferred"], [0])
+        self.assertEqual(response.data["failed"][0]["line"], 1)
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.branch, product=self.hammer).quantity, 5)
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.saw).quantity, 2)
+
+    def test_atomic_transfer_applies_nothing_on_failure(self):
+        response = self.client.post(self.url, {"lines": self.lines(), "atomic": True}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["transferred"], [])
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.hammer).quantity, 10)
+        self.assertFalse(WarehouseStock.objects.filter(warehouse=self.branch).exists())
+
+    def round_trip(self):
+        return [
+            {"source_warehouse_id": 1, "destination_warehouse_id": 2, "product_id": self.hammer.id, "quantity": 6},
+            {"source_warehouse_id": 2, "destination_warehouse_id": 1, "product_id": self.hammer.id, "quantity": 6},
+            {"source_warehouse_id": 1, "destination_warehouse_id": 2, "product_id": self.hammer.id, "quantity": 3},
+        ]
+
+    def test_round_trip_document(self):
+        response = self.client.post(self.url, {"lines": self.round_trip()}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["transferred"], [0, 1, 2])
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.hammer).quantity, 7)
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.branch, product=self.hammer).quantity, 3)
+
+        response = self.client.post(self.url, {"lines": self.round_trip(), "atomic": True}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["transferred"], [0, 1, 2])
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.hammer).quantity, 4)
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.branch, product=self.hammer).quantity, 6)
+
+    def test_repeated_key_document_with_a_failing_line(self):
+        lines = self.round_trip()[:1] * 2  # The second line asks for more than is left
+        response = self.client.post(self.url, {"lines": lines}, format="json")
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data["transferred"], [0])
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.branch, product=self.hammer).quantity, 6)
+
+        response = self.client.post(self.url, {"lines": lines, "atomic": True}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["failed"], [{"line": 0, "error": "Insufficient stock in the source warehouse."},
+                                                   {"line": 1, "error": "Insufficient stock in the source warehouse."}])
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.hammer).quantity, 4)
+
+    def test_single_line_transfer_still_supported(self):
+        response = self.client.post(self.url, self.lines()[0], format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.hammer).quantity, 5)
+
+
+class WarehouseStockQueryBudgetTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(id=1, name="Main", address="Street 1", country="Ethiopia")
+        self.category = Category.objects.create(name="Tools", description="Hand tools")
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+
+    def add_stock(self, count):
+        for _ in range(count):
+            product = Product.objects.create(name="Product", category=self.category, unit_price="1.00")
+            WarehouseStock.objects.create(product=product, warehouse=self.warehouse, quantity=1)
+
+    def test_stock_list_query_count_does_not_grow_with_page_size(self):
+        self.add_stock(1)
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(reverse("warehouse-stock-list"))
+
+        self.add_stock(4)
+        with CaptureQueriesContext(connection) as full_page:
+            response = self.client.get(reverse("warehouse-stock-list"))
+
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertEqual(len(full_page), len(small_page))
+        self.assertLessEqual(len(full_page), 2)  # COUNT(*) plus one joined SELECT
+
+
+class ProductStockSummaryTest(WarehouseTestCase):
+    def summary(self):
+        return ProductStockSummary.objects.get(product=self.product)
+
+    def test_direct_stock_edits_refresh_summary(self):
+        self.assertEqual(self.summary().on_hand, 10)
+        WarehouseStock.objects.create(product=self.product, warehouse=self.branch, quantity=5)
+        self.assertEqual(self.summary().on_hand, 15)
+
+    def test_deltas_update_summary_incrementally(self):
+        apply_stock_deltas([
+            StockDelta(self.main.id, self.product.id, -4, "sales-out"),
+            StockDelta(self.branch.id, self.product.id, 1, "purchase-in"),
+        ])
+        self.assertEqual(self.summary().on_hand, 7)
+
+        transfer_product(self.main.id, self.branch.id, self.product.id, 6)
+        self.assertEqual(self.summary().on_hand, 7)
+
+    def test_check_availability_for_whole_order(self):
+        check_availability({self.product.id: 10})
+        with self.assertRaises(InsufficientStock):
+            check_availability({self.product.id: 11})
+
+
+class StockMovementLedgerTest(WarehouseTestCase):
+    def movements(self, warehouse):
+        return list(
+            StockMovement.objects.filter(warehouse=warehouse, product=self.product)
+            .order_by("created_at", "id")
+            .values_list("delta", "balance", "reason")
+        )
+
+    def test_direct_stock_save_is_recorded_as_adjustment(self):
+        stock = WarehouseStock.objects.get(warehouse=self.main, product=self.product)
+        stock.quantity = 7
+        stock.save()
+        self.assertEqual(self.movements(self.main), [(10, 10, "created"), (-3, 7, "adjustment")])
+
+    def test_deleting_a_stock_row_closes_its_ledger(self):
+        WarehouseStock.objects.get(warehouse=self.main, product=self.product).delete()
+        self.assertEqual(self.movements(self.main), [(10, 10, "created"), (-10, 0, "deleted")])
+        self.assertEqual(stock_as_of(timezone.now()), {})
+
+        WarehouseStock.objects.create(product=self.product, warehouse=self.main, quantity=4)
+        WarehouseStock.objects.filter(product=self.product).delete()
+        self.assertEqual(self.movements(self.main)[-2:], [(4, 4, "created"), (-4, 0, "deleted")])
+
+    def test_deleting_a_product_takes_its_ledger_along(self):
+        self.product.delete()
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_transfer_records_both_sides_with_one_reference(self):
+        result = transfer_product(self.main.id, self.branch.id, self.product.id, 4)
+
+        self.assertEqual(self.movements(self.main)[-1], (-4, 6, "transfer-out"))
+        self.assertEqual(self.movements(self.branch), [(4, 4, "transfer-in")])
+        references = set(
+            StockMovement.objects.filter(reference_type="transfer").values_list("reference_id", flat=True)
+        )
+        self.assertEqual(references, {result["reference"]})
+
+    def test_bulk_transfer_balances_run_in_line_order(self):
+        transfer_products([
+            {"source_warehouse_id": 1, "destination_warehouse_id": 2, "product_id": self.product.id, "quantity": 3},
+            {"source_warehouse_id": 1, "destination_warehouse_id": 2, "product_id": self.product.id, "quantity": 2},
+        ])
+        self.assertEqual(self.movements(self.branch), [(3, 3, "transfer-in"), (2, 5, "transfer-in")])
+
+    def test_receipts_are_recorded_before_issues_of_the_same_batch(self):
+        WarehouseStock.objects.create(product=self.product, warehouse=self.branch, quantity=0)
+        apply_stock_deltas([
+            StockDelta(self.branch.id, self.product.id, -3, "transfer-out"),
+            StockDelta(self.branch.id, self.product.id, 3, "transfer-in"),
+            StockDelta(self.main.id, self.product.id, -12, "sales-out"),
+            StockDelta(self.main.id, self.product.id, 2, "purchase-in"),
+        ])
+        self.assertEqual(self.movements(self.branch)[-2:], [(3, 3, "transfer-in"), (-3, 0, "transfer-out")])
+        self.assertEqual(self.movements(self.main)[-2:], [(2, 12, "purchase-in"), (-12, 0, "sales-out")])
+
+    def test_ledger_endpoint_filters_by_warehouse(self):
+        transfer_product(self.main.id, self.branch.id, self.product.id, 4)
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+        client = APIClient()
+        client.force_authenticate(staff)
+
+        response = client.get(reverse("stock-movement-list"), {"warehouse": self.branch.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["delta"] for row in response.data["results"]], [4])
+
+
+class PointInTimeStockTest(WarehouseTestCase):
+    main_stock = None
+
+    def setUp(self):
+        super().setUp()
+        self.start = timezone.now() - timedelta(days=10)
+        # Backdate a history: 10 received on day 0, 4 moved to the branch on day 2, 3 sold on day 5
+        self.move(self.main, 10, 10, day=0)
+        self.move(self.main, -4, 6, day=2)
+        self.move(self.branch, 4, 4, day=2)
+        self.move(self.main, -3, 3, day=5)
+
+    def move(self, warehouse, delta, balance, day):
+        StockMovement.objects.create(
+            warehouse=warehouse, product=self.product, delta=delta, balance=balance,
+            reason="test", created_at=self.start + timedelta(days=day),
+        )
+
+    def day(self, day):
+        return self.start + timedelta(days=day, hours=1)
+
+    def test_replays_ledger_without_snapshots(self):
+        self.assertEqual(stock_as_of(self.day(1)), {(1, self.product.id): 10})
+        self.assertEqual(stock_as_of(self.day(3)), {(1, self.product.id): 6, (2, self.product.id): 4})
+
+    def test_snapshot_bounds_the_replay(self):
+        take_stock_snapshot(self.day(3))
+        # Movements before the snapshot no longer count; the checkpoint carries them
+        StockMovement.objects.filter(created_at__lt=self.day(3)).delete()
+
+        self.assertEqual(stock_as_of(self.day(4)), {(1, self.product.id): 6, (2, self.product.id): 4})
+        self.assertEqual(stock_as_of(self.day(6), warehouse_id=1), {(1, self.product.id): 3})
+
+    def test_snapshots_chain_from_the_previous_one(self):
+        take_stock_snapshot(self.day(1))
+        second = take_stock_snapshot(self.day(6))
+        self.assertEqual(
+            sorted(second.lines.values_list("warehouse_id", "quantity")), [(1, 3), (2, 4)]
+        )
+        self.assertEqual(take_stock_snapshot(self.day(6)), second)
+        self.assertEqual(StockSnapshot.objects.count(), 2)
+
+    def test_stock_list_as_of(self):
+        take_stock_snapshot(self.day(1))
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+        client = APIClient()
+        client.force_authenticate(staff)
+
+        response = client.get(reverse("warehouse-stock-list"), {"as_of": self.day(3).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["warehouse"]["w_name"], row["quantity"]) for row in response.data["results"]],
+            [("Main", 6), ("Branch", 4)],
+        )
 
-# Create your tests here.
+        response = client.get(reverse("warehouse-stock-list"), {"as_of": "not-a-date"})
+        self.assertEqual(response.status_code, 400)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from orders.models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem
+from orders.models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem, SalesOrderAllocation
 
 # Inline model to display the order items within the purchase order
 class PurchaseOrderItemInline(admin.TabularInline):
@@ -14,19 +14,37 @@ class PurchaseOrderAdmin(admin.ModelAdmin):
 
     # Making total_amount read-only
     readonly_fields = ['total_amount']
+    list_select_related = ['created_by']
+
+    def get_queryset(self, request):
+        # total_amount is read from the SQL annotation instead of per-row item queries
+        return super().get_queryset(request).with_totals()
 
 class SalesOrderItemInline(admin.TabularInline):
     model = SalesOrderItem
     extra = 1  # To allow one empty form to be displayed
 
+class SalesOrderAllocationInline(admin.TabularInline):
+    model = SalesOrderAllocation
+    extra = 0
+    can_delete = False
+    readonly_fields = ['product', 'warehouse', 'quantity', 'created_at']  # Written by the allocation engine
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 class SalesOrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'customer', 'status', 'created_at', 'updated_at', 'total_amount']
     list_filter = ['status', 'created_at', 'updated_at']  # Filter by status and time
     search_fields = ['customer__user__username']  # Search by customer username
-    inlines = [SalesOrderItemInline]  # Inline view of SalesOrderItems
+    inlines = [SalesOrderItemInline, SalesOrderAllocationInline]  # Inline view of SalesOrderItems and their allocations
 
     # Making total_amount read-only
     readonly_fields = ['total_amount']
+    list_select_related = ['customer__user']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
 
 class PurchaseOrderItemAdmin(admin.ModelAdmin):
     list_display = ['purchase_order', 'product', 'quantity']
@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.db import transaction
+
+from inventory.stock import DEFAULT_WAREHOUSE_ID, InsufficientStock, StockDelta, apply_stock_deltas, lock_stock
+from orders.models import SalesOrder, SalesOrderAllocation
+
+# Strategies receive the quantity needed and a list of (warehouse_id, available) for one
+# product, and return the warehouse ids to draw from, in order.
+
+
+def largest_first(quantity_needed, stocks):
+    """Draw from the fullest warehouses first."""
+    return [warehouse_id for warehouse_id, _ in sorted(stocks, key=lambda stock: (-stock[1], stock[0]))]
+
+
+def fewest_warehouses(quantity_needed, stocks):
+    """Ship from one warehouse when any can cover the line (the tightest fit), else fullest first."""
+    covering = [stock for stock in stocks if stock[1] >= quantity_needed]
+    if covering:
+        return [min(covering, key=lambda stock: (stock[1], stock[0]))[0]]
+    return largest_first(quantity_needed, stocks)
+
+
+def home_warehouse(quantity_needed, stocks):
+    """Use the home warehouse (SALES_ORDER_HOME_WAREHOUSE_ID) first, then the fullest others."""
+    home_id = getattr(settings, "SALES_ORDER_HOME_WAREHOUSE_ID", DEFAULT_WAREHOUSE_ID)
+    others = [warehouse_id for warehouse_id in largest_first(quantity_needed, stocks) if warehouse_id != home_id]
+    if any(warehouse_id == home_id for warehouse_id, _ in stocks):
+        return [home_id] + others
+    return others
+
+
+STRATEGIES = {
+    "largest_first": largest_first,
+    "fewest_warehouses": fewest_warehouses,
+    "home_warehouse": home_warehouse,
+}
+
+
+def get_strategy(name=None):
+    name = name or getattr(settings, "SALES_ORDER_ALLOCATION_STRATEGY", "largest_first")
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown allocation strategy '{name}'.")
+
+
+def plan_allocation(items, available, strategy):
+    """
+    Plan deductions for a whole order without touching the database.
+
+    `items` is a list of (product_id, quantity) and `available` maps
+    (warehouse_id, product_id) to the quantity on hand; it is consumed as lines are
+    planned so repeated products share stock correctly. Returns a list of
+    (warehouse_id, product_id, quantity) and raises InsufficientStock if any line
+    cannot be covered.
+    """
+    by_product = {}
+    for (warehouse_id, product_id) in available:
+        by_product.setdefault(product_id, []).append(warehouse_id)
+
+    plan = []
+    for product_id, quantity_needed in items:
+        stocks = [
+            (warehouse_id, available[(warehouse_id, product_id)])
+            for warehouse_id in by_product.get(product_id, [])
+            if available[(warehouse_id, product_id)] > 0
+        ]
+        remaining = quantity_needed
+        for warehouse_id in strategy(quantity_needed, stocks):
+            taken = min(available[(warehouse_id, product_id)], remaining)
+            if taken <= 0:
+                continue
+            available[(warehouse_id, product_id)] -= taken
+            plan.append((warehouse_id, product_id, taken))
+            remaining -= taken
+            if remaining == 0:
+                break
+
+        if remaining > 0:
+            raise InsufficientStock(
+                f"Not enough stock to approve the order for product {product_id}. "
+                f"Available: {quantity_needed - remaining}, Required: {quantity_needed}"
+            )
+    return plan
+
+
+def allocate_sales_order(order, strategy=None):
+    """
+    Deduct stock for every item of `order` and record where it came from.
+
+    The stock rows of all ordered products are locked once, the whole order is planned
+    in memory with the chosen strategy, and the plan is applied with one batched stock
+    update and one bulk insert of SalesOrderAllocation rows.
+    """
+    strategy = strategy if callable(strategy) else get_strategy(strategy)
+    items = list(order.items.values_list("product_id", "quantity"))
+
+    with transaction.atomic():
+        locked = lock_stock(product_ids={product_id for product_id, _ in items})
+        available = {key: stock.quantity for key, stock in locked.items()}
+        plan = plan_allocation(items, available, strategy)
+
+        apply_stock_deltas([
+            StockDelta(warehouse_id, product_id, -quantity, "sales-out", "sales_order", str(order.pk))
+            for warehouse_id, product_id, quantity in plan
+        ])
+        return SalesOrderAllocation.objects.bulk_create([
+            SalesOrderAllocation(sales_order=order, warehouse_id=warehouse_id, product_id=product_id, quantity=quantity)
+            for warehouse_id, product_id, quantity in plan
+        ])
+
+
+def release_sales_order(order):
+    """
+    Return the stock of a cancelled order to the warehouses it was allocated from,
+    in one batched stock update, and drop the allocation records.
+
+    Orders approved before allocations were recorded have none; their stock goes
+    back to the default warehouse as it always did. Returns False, changing nothing,
+    if the order (re-read under a row lock) no longer holds stock.
+    """
+    with transaction.atomic():
+        # A concurrent second cancellation waits here, then finds the order already cancelled
+        status = SalesOrder.objects.select_for_update().values_list("status", flat=True).get(pk=order.pk)
+        if status not in ("approved", "completed"):
+            return False
+        allocations = list(
+            order.allocations.select_for_update().order_by("id").values_list("warehouse_id", "product_id", "quantity")
+        )
+        if not allocations:
+            allocations = [
+                (DEFAULT_WAREHOUSE_ID, product_id, quantity)
+                for product_id, quantity in order.items.values_list("product_id", "quantity")
+            ]
+
+        apply_stock_deltas([
+            StockDelta(warehouse_id, product_id, quantity, "sales-return", "sales_order", str(order.pk))
+            for warehouse_id, product_id, quantity in allocations
+        ])
+        order.allocations.all().delete()
+        return True
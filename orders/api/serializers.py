@@ -4,8 +4,14 @@ from django.db import transaction
 from rest_framework import serializers
 from inventory.models import Product
 from orders.models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem
-from inventory.models import WarehouseStock
-from warehouse.models import Warehouse
+from inventory.stock import (
+    DEFAULT_WAREHOUSE_ID,
+    InsufficientStock,
+    StockDelta,
+    apply_stock_deltas,
+    check_availability,
+)
+from orders.allocation import allocate_sales_order, release_sales_order
 
 class PurchaseOrderItemSerializer(serializers.ModelSerializer):
     product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())  # Ensure the product exists
@@ -61,8 +67,11 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
 
         return purchase_order
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        # Check the status change
+        # Lock the order and re-read its status, so concurrent or repeated completions run
+        # one after the other and only the first receives the stock
+        instance.status = PurchaseOrder.objects.select_for_update().values_list("status", flat=True).get(pk=instance.pk)
         new_status = validated_data.get("status", instance.status)
         
 
@@ -87,6 +96,7 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
                 PurchaseOrderItem.objects.create(
                     purchase_order=instance, **item_data
                 )
+            instance.items_changed()
         elif instance.status in ["approved", "completed", "cancelled"]:
             if items_data:
                 raise serializers.ValidationError(
@@ -100,25 +110,14 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
         if new_status in ["cancelled", "completed"]:
             instance.is_active = False
         
-        if new_status == "completed":
-            # Always refer to warehouse with ID=1
-            warehouse = Warehouse.objects.get(id=1)
-
-            # Loop through the items and update stock in the warehouse
-            for item in instance.items.all():
-                product = item.product
-                quantity = item.quantity
-                
-                # Find or create the corresponding WarehouseStock record for warehouse with ID=1
-                warehouse_stock, created = WarehouseStock.objects.get_or_create(
-                    product=product,
-                    warehouse=warehouse,
-                    defaults={"quantity": 0}  # In case it's newly created, start with 0
+        if new_status == "completed" and instance.status != "completed":
+            # Receive every item into the default warehouse in one locked batch
+            apply_stock_deltas([
+                StockDelta(
+                    DEFAULT_WAREHOUSE_ID, item.product_id, item.quantity, "purchase-in", "purchase_order", str(instance.pk)
                 )
-                
-                # Increase the quantity in the warehouse
-                warehouse_stock.quantity += quantity
-                warehouse_stock.save()    
+                for item in instance.prefetch_items()  # Loaded once, reused by the audit log and the response
+            ])
         # Update the status and save the order
         instance.status = new_status
         instance.save()
@@ -169,7 +168,11 @@ class SalesOrderSerializer(serializers.ModelSerializer):
         return sales_order
 
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        # Lock the order and re-read its status, so concurrent status changes (e.g. two
+        # cancellations) run one after the other and only the first moves stock
+        instance.status = SalesOrder.objects.select_for_update().values_list('status', flat=True).get(pk=instance.pk)
         new_status = validated_data.get('status', instance.status)
 
         # Prevent changing status from approved to pending
@@ -182,6 +185,7 @@ class SalesOrderSerializer(serializers.ModelSerializer):
             if items_data is not None:  # Check if items_data is provided
                 instance.items.all().delete()  # Remove old items
                 self._create_sales_order_items(instance, items_data)
+                instance.items_changed()
         elif instance.status in ['completed', 'cancelled', 'approved']:
             if items_data is not None:  # Check if items_data is provided
                 raise serializers.ValidationError(
@@ -189,11 +193,12 @@ class SalesOrderSerializer(serializers.ModelSerializer):
                 )
 
         # Handle stock deduction and return logic
-        if new_status == 'approved':
+        if new_status == 'approved' and instance.status != 'approved':
             self._validate_stock_availability(items_data or [])
             self._deduct_stock(instance)
 
-        if new_status == 'cancelled':
+        # Only approved or completed orders have had stock deducted
+        if new_status == 'cancelled' and instance.status in ['approved', 'completed']:
             self._return_stock(instance)
 
         if new_status in ['cancelled', 'completed']:
@@ -212,55 +217,24 @@ class SalesOrderSerializer(serializers.ModelSerializer):
             SalesOrderItem.objects.create(sales_order=sales_order, **item_data)
 
     def _validate_stock_availability(self, items_data):
+        quantities = {}
         for item_data in items_data:
-            quantity_needed = item_data['quantity']
-            product = item_data['product']
-            
-            # Check total quantity available across all warehouse stocks
-            total_available = sum(
-                warehouse_stock.quantity for warehouse_stock in WarehouseStock.objects.filter(product=product)
-            )
-            if total_available < quantity_needed:
-                raise serializers.ValidationError(f"Insufficient stock for product {product}. Available: {total_available}, Required: {quantity_needed}")
+            product_id = item_data['product'].id
+            quantities[product_id] = quantities.get(product_id, 0) + item_data['quantity']
+
+        # One lookup of the per-product stock totals for the whole order
+        try:
+            check_availability(quantities)
+        except InsufficientStock as e:
+            raise serializers.ValidationError(str(e))
 
     def _deduct_stock(self, order):
-    # Using atomic transaction to ensure data integrity
-        with transaction.atomic():
-            for item in order.items.all():
-                product_stock_entries = WarehouseStock.objects.filter(product=item.product)
-                quantity_needed = item.quantity
-
-                for stock in product_stock_entries:
-                    if quantity_needed <= 0:
-                        break  # Exit if no more quantity is needed
-
-                    if stock.quantity > 0:
-                        if stock.quantity >= quantity_needed:
-                            stock.quantity -= quantity_needed  # Fulfill the order
-                            stock.save()
-                            quantity_needed = 0  # Order fully fulfilled
-                        else:
-                            quantity_needed -= stock.quantity  # Use available stock
-                            stock.quantity = 0  # All available stock used
-                            stock.save()
-
-                # If still need quantity after checking all stocks
-                if quantity_needed > 0:
-                    # Rollback previous deductions if stock is insufficient
-                    for stock in product_stock_entries:
-                        stock.quantity += (item.quantity - quantity_needed)  # Restore the excess
-                        stock.save()
-
-                    # Raise an error indicating insufficient stock
-                    raise serializers.ValidationError(
-                        f"Not enough stock to approve the order for product {item.product}."
-                    )
+        # Plans the whole order against locked stock and applies it in one batch
+        try:
+            allocate_sales_order(order)
+        except InsufficientStock as e:
+            raise serializers.ValidationError(str(e))
 
     def _return_stock(self, order):
-        for item in order.items.all():
-            product_stock, created = WarehouseStock.objects.get_or_create(
-                product=item.product,
-                warehouse=1  # Assuming warehouse ID is 1
-            )
-            product_stock.quantity += item.quantity
-            product_stock.save()
\ No newline at end of file
+        # Back to the warehouses the stock was allocated from, in one batch
+        release_sales_order(order)
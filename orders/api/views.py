@@ -12,9 +12,58 @@ from orders.api.serializers import (
 from inventory.models import Product
 from orders.permissions import IsCustomer, IsStoreAdminOrStaff
 from django.db import transaction
+
+
+def _validate_new_items(items_data, existing_product_ids, missing_status):
+    """
+    Validate items for add_items with one IN query for all products.
+
+    Returns ([(product, quantity), ...], None) or (None, error Response). Products
+    already on the order or repeated in the request are rejected.
+    """
+    if not all(isinstance(item_data, dict) for item_data in items_data):
+        return None, Response(
+            {"detail": "Invalid data format. 'items' should be a list of dictionaries."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    product_ids = []
+    quantities = []
+    for item_data in items_data:
+        try:
+            product_ids.append(int(item_data.get("product")))
+            quantities.append(int(item_data.get("quantity")))
+        except (TypeError, ValueError):
+            return None, Response(
+                {"detail": "Each item needs an integer 'product' and 'quantity'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if quantities[-1] <= 0:
+            return None, Response(
+                {"detail": "Quantity must be greater than zero."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    products = Product.objects.in_bulk(product_ids)
+    seen = set(existing_product_ids)
+    new_items = []
+    for product_id, quantity in zip(product_ids, quantities):
+        if product_id not in products:
+            return None, Response(
+                {"detail": f"Product with id {product_id} does not exist."},
+                status=missing_status,
+            )
+        if product_id in seen:
+            return None, Response({"error": "The Product Already Exist"}, status=status.HTTP_400_BAD_REQUEST)
+        seen.add(product_id)
+        new_items.append((products[product_id], quantity))
+    return new_items, None
+
+
 # PurchaseOrder ViewSet
 class PurchaseOrderViewSet(viewsets.ModelViewSet):
-    queryset = PurchaseOrder.objects.all()
+    # Totals, creators and items for a whole page in a fixed number of queries
+    queryset = PurchaseOrder.objects.with_totals().select_related("created_by").with_items().order_by("id")
     serializer_class = PurchaseOrderSerializer
     permission_classes = [IsAuthenticated, IsStoreAdminOrStaff]  # Ensure authenticated access
 
@@ -47,13 +96,6 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
     def add_items(self, request, pk=None):
         purchase_order = self.get_object()
 
-        # Check if the order status is approved before allowing item addition
-        if purchase_order.status != "pending":
-            return Response(
-                {"detail": "You can only add items to a pending order."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
         items_data = request.data.get("items", None)
     
         if not isinstance(items_data, list):
@@ -68,26 +110,25 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         
-        # Validate and add the new items
-        for item_data in items_data:
-            # Get the product instance using the provided product ID
-            product_id = item_data.get("product")
-            try:
-                product = Product.objects.get(id=product_id)  # Fetch the product instance
-            except Product.DoesNotExist:
+        with transaction.atomic():
+            # Lock the order so concurrent add_items calls cannot both add the same product, and
+            # re-read its status: an approval may have committed since it was loaded
+            purchase_order.status = (
+                PurchaseOrder.objects.select_for_update().values_list("status", flat=True).get(pk=purchase_order.pk)
+            )
+            if purchase_order.status != "pending":
                 return Response(
-                    {"detail": f"Product with id {product_id} does not exist."},
-                    status=status.HTTP_404_NOT_FOUND,
+                    {"detail": "You can only add items to a pending order."},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-
-            if PurchaseOrderItem.objects.filter(purchase_order=purchase_order, product=product).exists():
-                return Response({"error":"The Product Already Exist"})
-            # Create the PurchaseOrderItem instance
-            PurchaseOrderItem.objects.create(
-                purchase_order=purchase_order,
-                product=product,  # Assign the actual Product instance
-                quantity=item_data.get("quantity")
-            )
+            existing = set(purchase_order.items.values_list("product_id", flat=True))
+            new_items, error = _validate_new_items(items_data, existing, status.HTTP_404_NOT_FOUND)
+            if error:
+                return error
+            PurchaseOrderItem.objects.bulk_create([
+                PurchaseOrderItem(purchase_order=purchase_order, product=product, quantity=quantity)
+                for product, quantity in new_items
+            ])
 
         return Response(
             {"detail": "Items added successfully."},
@@ -102,7 +143,8 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
 
 # SalesOrder ViewSet
 class SalesOrderViewSet(viewsets.ModelViewSet):
-    queryset = SalesOrder.objects.all()
+    # Totals, customers and items for a whole page in a fixed number of queries
+    queryset = SalesOrder.objects.with_totals().select_related("customer__user").with_items().order_by("id")
     serializer_class = SalesOrderSerializer
     permission_classes = [IsAuthenticated, IsCustomer]
 
@@ -124,37 +166,38 @@ class SalesOrderViewSet(viewsets.ModelViewSet):
     def add_items(self, request, pk=None):
         sales_order = self.get_object()
 
-        # Only allow adding items if the order is pending
-        if sales_order.status != "pending":
+        items_data = request.data.get("items", [])
+        if not items_data:
             return Response(
-                {"detail": "You can only add items to a pending sales order."},
+                {"detail": "You must provide items to add."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        items_data = request.data.get("items", [])
-        if not items_data:
+        if not isinstance(items_data, list):
             return Response(
-                {"detail": "You must provide items to add."},
+                {"detail": "Invalid data format. 'items' should be a list of dictionaries."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Validate and add the new items
-        for item_data in items_data:
-            # Ensure that a valid product ID is provided
-            product_id = item_data.get('product')
-            try:
-                # Get the Product instance
-                product = Product.objects.get(id=product_id)
-                item_data['product'] = product  # Assign the product instance to item_data
-            except Product.DoesNotExist:
+        with transaction.atomic():
+            # Lock the order so concurrent add_items calls cannot both add the same product, and
+            # re-read its status: an approval may have committed since it was loaded
+            sales_order.status = (
+                SalesOrder.objects.select_for_update().values_list("status", flat=True).get(pk=sales_order.pk)
+            )
+            if sales_order.status != "pending":
                 return Response(
-                    {"detail": f"Product with id {product_id} does not exist."},
+                    {"detail": "You can only add items to a pending sales order."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-
-        with transaction.atomic():
-            for item_data in items_data:
-                SalesOrderItem.objects.create(sales_order=sales_order, **item_data)
+            existing = set(sales_order.items.values_list("product_id", flat=True))
+            new_items, error = _validate_new_items(items_data, existing, status.HTTP_400_BAD_REQUEST)
+            if error:
+                return error
+            SalesOrderItem.objects.bulk_create([
+                SalesOrderItem(sales_order=sales_order, product=product, quantity=quantity)
+                for product, quantity in new_items
+            ])
 
         return Response(
             {"detail": "Items added successfully."}, status=status.HTTP_200_OK
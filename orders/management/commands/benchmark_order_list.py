@@ -0,0 +1,62 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Category, Product
+from orders.api.serializers import PurchaseOrderSerializer, SalesOrderSerializer
+from orders.api.views import PurchaseOrderViewSet, SalesOrderViewSet
+from orders.models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem
+from users.models import CustomUser, Customer
+
+
+class Command(BaseCommand):
+    help = "Compare query count and latency of serializing a page of orders with the bare and the optimized querysets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=100, help="Orders on the page (default 100).")
+        parser.add_argument("--items", type=int, default=5, help="Items per order (default 5).")
+
+    def handle(self, *args, **options):
+        # Everything is created inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            self._create_orders(options["orders"], options["items"])
+            page = options["orders"]
+            cases = [
+                ("purchase orders", PurchaseOrderSerializer, PurchaseOrder.objects.all(), PurchaseOrderViewSet.queryset),
+                ("sales orders", SalesOrderSerializer, SalesOrder.objects.all(), SalesOrderViewSet.queryset),
+            ]
+            for label, serializer_class, before, after in cases:
+                for name, queryset in (("before", before.order_by("id")), ("after", after.all())):
+                    queries, elapsed = self._measure(serializer_class, queryset[:page])
+                    self.stdout.write(f"{label:<16} {name:<7} {queries:>5} queries {elapsed * 1000:>9.1f} ms")
+            transaction.set_rollback(True)
+
+    def _measure(self, serializer_class, queryset):
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as context:
+            serializer_class(queryset, many=True).data
+        return len(context), time.perf_counter() - start
+
+    def _create_orders(self, order_count, item_count):
+        # Unique names, so the (rolled back) data cannot clash with rows already in the database
+        suffix = uuid.uuid4().hex[:12]
+        category = Category.objects.create(name=f"Benchmark category {suffix}", description="Benchmark")
+        products = Product.objects.bulk_create(
+            [Product(name=f"Benchmark product {i}", category=category, unit_price=i + 1) for i in range(item_count)]
+        )
+        user = CustomUser.objects.create(
+            email=f"benchmark-{suffix}@example.com", username=f"benchmark-{suffix}", role="customer"
+        )
+        customer = Customer.objects.create(user=user, phone_number="0")
+
+        purchase_orders = PurchaseOrder.objects.bulk_create([PurchaseOrder(created_by=user) for _ in range(order_count)])
+        sales_orders = SalesOrder.objects.bulk_create([SalesOrder(customer=customer) for _ in range(order_count)])
+        PurchaseOrderItem.objects.bulk_create(
+            [PurchaseOrderItem(purchase_order=order, product=product, quantity=1) for order in purchase_orders for product in products]
+        )
+        SalesOrderItem.objects.bulk_create(
+            [SalesOrderItem(sales_order=order, product=product, quantity=1) for order in sales_orders for product in products]
+        )
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_productstocksummary'),
+        ('orders', '0002_purchaseorder_is_active_salesorder_is_active_and_more'),
+        ('warehouse', '0003_alter_warehouse_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesOrderAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.product')),
+                ('sales_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='orders.salesorder')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_allocations', to='warehouse.warehouse')),
+            ],
+        ),
+    ]
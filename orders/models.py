@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import DecimalField, F, Prefetch, Sum, Value, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from inventory.models import Product
+from warehouse.models import Warehouse
 from users.models import CustomUser, Customer
 
 STATUS_CHOICES = [
@@ -9,6 +12,27 @@ STATUS_CHOICES = [
     ('cancelled', 'Cancelled'),
 ]
 
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate each order with the sum of quantity * unit price of its items, computed in SQL."""
+        return self.annotate(
+            annotated_total=Coalesce(
+                Sum(F("items__quantity") * F("items__product__unit_price"), output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Value(0),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+    def with_items(self):
+        """Prefetch the items together with their products, for payloads that name them."""
+        return self.prefetch_related(_items_prefetch(self.model))
+
+
+def _items_prefetch(order_model):
+    item_model = order_model._meta.get_field("items").related_model
+    return Prefetch("items", queryset=item_model.objects.select_related("product"))
+
+
 class PurchaseOrder(models.Model):
     created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name="purchase_orders")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -16,14 +40,30 @@ class PurchaseOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     def __str__(self):
         return f"Purchase Order #{self.id} by {self.created_by.username}"
 
     @property
     def total_amount(self):
+        # Querysets from with_totals() already carry the total
+        if "annotated_total" in self.__dict__:
+            return self.annotated_total
         total = sum(item.quantity * item.product.unit_price for item in self.items.all())  # Fixed relationship
         return total
 
+    def items_changed(self):
+        """Forget the annotated total and any prefetched items once the items have changed."""
+        self.__dict__.pop("annotated_total", None)
+        getattr(self, "_prefetched_objects_cache", {}).pop("items", None)
+
+    def prefetch_items(self):
+        """The items with their products, loaded in one query unless already prefetched; items.all() reuses them."""
+        if "items" not in getattr(self, "_prefetched_objects_cache", {}):
+            prefetch_related_objects([self], _items_prefetch(type(self)))
+        return list(self.items.all())
+
 class PurchaseOrderItem(models.Model):
     purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -40,14 +80,30 @@ class SalesOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     def __str__(self):
         return f"Sales Order #{self.id} for {self.customer.user.username}"
 
     @property
     def total_amount(self):
+        # Querysets from with_totals() already carry the total
+        if "annotated_total" in self.__dict__:
+            return self.annotated_total
         total = sum(item.quantity * item.product.unit_price for item in self.items.all())  # Similar to PurchaseOrder
         return total
 
+    def items_changed(self):
+        """Forget the annotated total and any prefetched items once the items have changed."""
+        self.__dict__.pop("annotated_total", None)
+        getattr(self, "_prefetched_objects_cache", {}).pop("items", None)
+
+    def prefetch_items(self):
+        """The items with their products, loaded in one query unless already prefetched; items.all() reuses them."""
+        if "items" not in getattr(self, "_prefetched_objects_cache", {}):
+            prefetch_related_objects([self], _items_prefetch(type(self)))
+        return list(self.items.all())
+
 class SalesOrderItem(models.Model):
     sales_order = models.ForeignKey(SalesOrder, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -55,3 +111,15 @@ class SalesOrderItem(models.Model):
 
     def __str__(self):
         return f"{self.product.name} (Qty: {self.quantity})"
+
+
+class SalesOrderAllocation(models.Model):
+    """How much of a sales order item was taken from which warehouse when the order was approved."""
+    sales_order = models.ForeignKey(SalesOrder, on_delete=models.CASCADE, related_name='allocations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='sales_allocations')
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Sales Order #{self.sales_order_id}: {self.quantity} of product {self.product_id} from warehouse {self.warehouse_id}"
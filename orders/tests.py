@@ -1,3 +1,234 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from inventory.models import Category, Product, WarehouseStock
+from warehouse.models import Warehouse
+from users.models import Customer
+from orders.models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem
+from orders.api.views import PurchaseOrderViewSet, SalesOrderViewSet
+from orders.api.serializers import PurchaseOrderSerializer, SalesOrderSerializer
+from orders.allocation import largest_first, fewest_warehouses, home_warehouse, release_sales_order
 
-# Create your tests here.
+CustomUser = get_user_model()
+
+
+class AllocationStrategyTest(TestCase):
+    stocks = [(1, 3), (2, 8), (3, 5)]
+
+    def test_largest_first(self):
+        self.assertEqual(largest_first(6, self.stocks), [2, 3, 1])
+
+    def test_fewest_warehouses_prefers_tightest_single_fit(self):
+        self.assertEqual(fewest_warehouses(4, self.stocks), [3])
+        self.assertEqual(fewest_warehouses(10, self.stocks), [2, 3, 1])
+
+    def test_home_warehouse_first(self):
+        with self.settings(SALES_ORDER_HOME_WAREHOUSE_ID=1):
+            self.assertEqual(home_warehouse(6, self.stocks), [1, 2, 3])
+
+
+class WarehouseTestCase(TestCase):
+    """The Main (id 1) and Branch (id 2) warehouses holding 3 and 5 of a Hammer in Tools."""
+    def setUp(self):
+        self.main = Warehouse.objects.create(id=1, name="Main", address="Street 1", country="Ethiopia")
+        self.branch = Warehouse.objects.create(id=2, name="Branch", address="Street 2", country="Ethiopia")
+        self.category = Category.objects.create(name="Tools", description="Hand tools")
+        self.product = Product.objects.create(name="Hammer", category=self.category, unit_price="10.00")
+        WarehouseStock.objects.create(product=self.product, warehouse=self.main, quantity=3)
+        WarehouseStock.objects.create(product=self.product, warehouse=self.branch, quantity=5)
+
+
+class SalesOrderTestCase(WarehouseTestCase):
+    def setUp(self):
+        super().setUp()
+        user = CustomUser.objects.create_user(
+            email="customer@example.com", username="customeruser", password="password123", role="customer"
+        )
+        customer = Customer.objects.create(user=user, phone_number="987654321")
+        self.order = SalesOrder.objects.create(customer=customer)
+        SalesOrderItem.objects.create(sales_order=self.order, product=self.product, quantity=6)
+
+
+class SalesOrderApprovalTest(SalesOrderTestCase):
+    def approve(self):
+        serializer = SalesOrderSerializer(self.order, data={"status": "approved"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def stock(self, warehouse):
+        return WarehouseStock.objects.get(warehouse=warehouse, product=self.product).quantity
+
+    def test_approval_records_allocations(self):
+        self.approve()
+
+        self.assertEqual(self.stock(self.branch), 0)
+        self.assertEqual(self.stock(self.main), 2)
+        self.assertEqual(
+            sorted(self.order.allocations.values_list("warehouse_id", "quantity")),
+            [(1, 1), (2, 5)],
+        )
+
+    def test_insufficient_stock_leaves_stock_untouched(self):
+        self.order.items.update(quantity=9)
+        with self.assertRaises(ValidationError):
+            self.approve()
+
+        self.assertEqual(self.stock(self.main), 3)
+        self.assertEqual(self.stock(self.branch), 5)
+        self.assertFalse(self.order.allocations.exists())
+
+    def test_cancellation_returns_stock_to_allocated_warehouses(self):
+        self.approve()
+        serializer = SalesOrderSerializer(self.order, data={"status": "cancelled"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.assertEqual(self.stock(self.main), 3)
+        self.assertEqual(self.stock(self.branch), 5)
+        self.assertFalse(self.order.allocations.exists())
+
+    def test_a_second_cancellation_from_a_stale_copy_returns_nothing(self):
+        self.order.allocations.all().delete()  # An order approved before allocations were recorded
+        SalesOrder.objects.filter(pk=self.order.pk).update(status="approved")
+        first = SalesOrder.objects.get(pk=self.order.pk)
+        second = SalesOrder.objects.get(pk=self.order.pk)  # Loaded before the first cancellation commits
+
+        for order in (first, second):
+            serializer = SalesOrderSerializer(order, data={"status": "cancelled"}, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+        self.assertEqual(self.stock(self.main), 9)  # The 6 units went back once
+        self.assertEqual(self.stock(self.branch), 5)
+        self.assertFalse(release_sales_order(second))
+
+
+class PurchaseOrderReceiptTest(WarehouseTestCase):
+    def setUp(self):
+        super().setUp()
+        staff = CustomUser.objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+        self.purchase = PurchaseOrder.objects.create(created_by=staff, status="approved")
+        PurchaseOrderItem.objects.create(purchase_order=self.purchase, product=self.product, quantity=4)
+
+    def complete(self, order):
+        serializer = PurchaseOrderSerializer(order, data={"status": "completed"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_stock_is_received_once(self):
+        first = PurchaseOrder.objects.get(pk=self.purchase.pk)
+        second = PurchaseOrder.objects.get(pk=self.purchase.pk)  # Loaded before the first completion commits
+        self.complete(first)
+        self.complete(second)
+        self.complete(PurchaseOrder.objects.get(pk=self.purchase.pk))  # The same PATCH repeated later
+
+        self.assertEqual(WarehouseStock.objects.get(warehouse=self.main, product=self.product).quantity, 7)
+        self.assertEqual(PurchaseOrder.objects.get(pk=self.purchase.pk).status, "completed")
+
+
+class OrderTotalsTest(SalesOrderTestCase):
+    def test_with_totals_matches_property(self):
+        order = SalesOrder.objects.with_totals().get(pk=self.order.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(order.total_amount, Decimal("60.00"))
+        self.assertEqual(SalesOrder.objects.get(pk=self.order.pk).total_amount, Decimal("60.00"))
+
+    def test_order_without_items_totals_zero(self):
+        self.order.items.all().delete()
+        self.assertEqual(SalesOrder.objects.with_totals().get(pk=self.order.pk).total_amount, 0)
+
+
+class OrderListQueryBudgetTest(SalesOrderTestCase):
+    def list_queries(self):
+        client = APIClient()
+        client.force_authenticate(self.order.customer.user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(reverse("sales-order-list"))
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_sales_order_list_query_count_is_constant(self):
+        one_order = self.list_queries()
+        for _ in range(4):
+            order = SalesOrder.objects.create(customer=self.order.customer)
+            SalesOrderItem.objects.create(sales_order=order, product=self.product, quantity=2)
+
+        self.assertEqual(self.list_queries(), one_order)
+
+
+class BenchmarkOrderListCommandTest(TestCase):
+    def test_runs_beside_existing_benchmark_data_and_leaves_nothing(self):
+        CustomUser.objects.create_user(email="benchmark@example.com", username="benchmark", password="x")
+        Category.objects.create(name="Benchmark category", description="Benchmark")
+        out = StringIO()
+        call_command("benchmark_order_list", orders=3, items=2, stdout=out)
+
+        self.assertIn("sales orders", out.getvalue())
+        self.assertEqual(CustomUser.objects.count(), 1)
+        self.assertFalse(SalesOrder.objects.exists())
+
+
+class AddItemsTest(SalesOrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [
+            Product.objects.create(name=f"Product {i}", category=self.category, unit_price="1.00") for i in range(20)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.order.customer.user)
+        self.url = reverse("sales-order-add-items", args=[self.order.pk])
+
+    def test_add_items_costs_constant_queries(self):
+        items = [{"product": product.id, "quantity": 1} for product in self.products]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, {"items": items}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.order.items.count(), 21)
+        self.assertLess(len(context), 12)
+
+    def test_duplicate_or_missing_product_adds_nothing(self):
+        items = [{"product": self.products[0].id, "quantity": 1}, {"product": self.product.id, "quantity": 1}]
+        response = self.client.post(self.url, {"items": items}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        items = [{"product": self.products[0].id, "quantity": 1}, {"product": 9999, "quantity": 1}]
+        response = self.client.post(self.url, {"items": items}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.order.items.count(), 1)
+
+    def test_order_approved_after_it_was_loaded_gets_no_items(self):
+        stale = SalesOrder.objects.get(pk=self.order.pk)
+        SalesOrder.objects.filter(pk=self.order.pk).update(status="approved")  # A concurrent approval
+        with mock.patch.object(SalesOrderViewSet, "get_object", return_value=stale):
+            response = self.client.post(self.url, {"items": [{"product": self.products[0].id, "quantity": 1}]}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.order.items.count(), 1)
+
+    def test_purchase_order_approved_after_it_was_loaded_gets_no_items(self):
+        staff = CustomUser.objects.create_user(
+            email="staff@example.com", username="staff", password="password123", role="staff"
+        )
+        order = PurchaseOrder.objects.create(created_by=staff)
+        stale = PurchaseOrder.objects.get(pk=order.pk)
+        PurchaseOrder.objects.filter(pk=order.pk).update(status="approved")
+        self.client.force_authenticate(staff)
+        with mock.patch.object(PurchaseOrderViewSet, "get_object", return_value=stale):
+            response = self.client.post(
+                reverse("purchase-order-add-items", args=[order.pk]),
+                {"items": [{"product": self.product.id, "quantity": 1}]}, format="json",
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(order.items.exists())
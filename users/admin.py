@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from users.models import CustomUser, AcessCode, Supplier, Customer, UserRank, Address
+from users.models import DEFAULT_RANK, CustomUser, AcessCode, Supplier, Customer, UserRank, Address
 
 
 @admin.register(CustomUser)
@@ -68,6 +68,12 @@ class CustomerAdmin(admin.ModelAdmin):
 @admin.register(UserRank)
 class RankAdmin(admin.ModelAdmin):
     list_display = ("rank",)
+
+    def has_delete_permission(self, request, obj=None):
+        # New profiles get the default rank; see users.signals.protect_default_rank
+        if obj is not None and obj.rank == DEFAULT_RANK:
+            return False
+        return super().has_delete_permission(request, obj)
     
 @admin.register(Address)
 class AddressAdmin(admin.ModelAdmin):
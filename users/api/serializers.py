@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from users.models import CustomUser, Supplier, Address, AcessCode, Customer
-from users.functions import generate_unique_code
+from users.functions import create_access_codes
 
 # Serializer for registering employees (staff, store_manager)
 class EmployeeRegisterSerializer(serializers.ModelSerializer):
@@ -117,10 +117,10 @@ class SupplierRegisterSerializer(serializers.ModelSerializer):
         
         password2 = validated_data.pop("password2", None)
         password = validated_data.pop("password", None)
-        user = CustomUser.objects.create(**validated_data)
         if password != password2:
             raise serializers.ValidationError({"error": "Passwords do not match."})
-        
+
+        user = CustomUser(**validated_data)
         if password:
             user.set_password(password)
         user.save()
@@ -275,6 +275,24 @@ class AcessCodeSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'code']  # 'code' is generated automatically
 
     def create(self, validated_data):
-        # Generate the random code and add it to the validated data
-        validated_data['code'] = generate_unique_code()
-        return super().create(validated_data)
\ No newline at end of file
+        # The code is generated; the unique constraint on it guards against clashes
+        return create_access_codes({validated_data['role']: 1})[0]
+
+
+class AccessCodeBatchSerializer(serializers.Serializer):
+    """How many codes to issue per role, e.g. {"counts": {"customer": 200, "staff": 10}}."""
+    MAX_PER_ROLE = 1000
+
+    counts = serializers.DictField(child=serializers.IntegerField(min_value=1, max_value=MAX_PER_ROLE))
+
+    def validate_counts(self, value):
+        roles = dict(CustomUser.ROLE_CHOICES)
+        unknown = [role for role in value if role not in roles]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown roles: {', '.join(unknown)}.")
+        if not value:
+            raise serializers.ValidationError("Give a count for at least one role.")
+        return value
+
+    def create(self, validated_data):
+        return create_access_codes(validated_data['counts'])
\ No newline at end of file
@@ -8,7 +8,8 @@ from users.api.views import (EmployeeRegisterView,
                              UserListView, 
                              AddressDetailView,
                              AccessCodeDetailView,
-                             AccessCodeListCreateView
+                             AccessCodeListCreateView,
+                             AccessCodeBatchCreateView
 )
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -31,5 +32,6 @@ urlpatterns = [
     path('user/address/', AddressDetailView.as_view(), name='address-detail'), 
     
      path('access-codes/', AccessCodeListCreateView.as_view(), name='access_code_list_create'),
+    path('access-codes/batch/', AccessCodeBatchCreateView.as_view(), name='access_code_batch_create'),
     path('access-codes/<uuid:pk>/', AccessCodeDetailView.as_view(), name='access_code_detail'),
 ]
\ No newline at end of file
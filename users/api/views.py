@@ -11,7 +11,8 @@ from users.api.serializers import (
     AddressSerializer,
     CustomerRegisterSerializer,
     UserListSerializer,
-    AcessCodeSerializer
+    AcessCodeSerializer,
+    AccessCodeBatchSerializer
 )
 from rest_framework import permissions
 from rest_framework import generics
@@ -84,8 +85,8 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
     lookup_field = 'pk'
 
     def get_object(self):
-        # Return the currently authenticated user
-        return self.request.user
+        # Return the currently authenticated user, fully loaded (request.user only holds the token claims)
+        return CustomUser.objects.get(pk=self.request.user.pk)
 
     def put(self, request, *args, **kwargs):
         # Fetch the user object (authenticated user)
@@ -196,6 +197,17 @@ class AccessCodeListCreateView(generics.ListCreateAPIView):
     serializer_class = AcessCodeSerializer
     permission_classes = [IsAdminUser]
 
+class AccessCodeBatchCreateView(generics.CreateAPIView):
+    """Issue many access codes at once, e.g. when onboarding a store."""
+    serializer_class = AccessCodeBatchSerializer
+    permission_classes = [IsAdminUser]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        access_codes = serializer.save()
+        return Response(AcessCodeSerializer(access_codes, many=True).data, status=status.HTTP_201_CREATED)
+
 class AccessCodeDetailView(generics.RetrieveDestroyAPIView):
     queryset = AcessCode.objects.all()
     serializer_class = AcessCodeSerializer
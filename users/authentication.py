@@ -0,0 +1,101 @@
+"""
+JWT authentication without a user query per request.
+
+Access tokens carry the user's role, is_staff and customer profile id as claims.
+ClaimsJWTAuthentication builds request.user from them as a CustomUser whose other
+fields are deferred, so they are only loaded if a view reads them. The username is
+not a claim: it can change, and audit rows record it, so it is always read fresh. Whether the
+account is still active, and still has that role, is looked up at most once per
+JWT_USER_STATE_TTL seconds per user and process.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import DEFERRED
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import CustomUser, Customer
+
+_state_cache = {}
+_state_lock = threading.Lock()
+
+
+def forget_user(user_id):
+    """Drop the cached account state of a user, e.g. after it was deactivated."""
+    with _state_lock:
+        _state_cache.pop(user_id, None)
+
+
+def _account_state(user_id):
+    """(is_active, role, is_staff) of the user, or None if it no longer exists; cached briefly."""
+    now = time.monotonic()
+    with _state_lock:
+        cached = _state_cache.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    state = CustomUser.objects.filter(pk=user_id).values_list("is_active", "role", "is_staff").first()
+    with _state_lock:
+        if len(_state_cache) > 10000:
+            _state_cache.clear()
+        _state_cache[user_id] = (now + getattr(settings, "JWT_USER_STATE_TTL", 30), state)
+    return state
+
+
+def _lightweight_user(user_id, claims):
+    """A CustomUser holding only the claimed fields; any other field is loaded on first access."""
+    known = {
+        "id": user_id,
+        "role": claims["role"],
+        "is_staff": claims.get("is_staff", False),
+        "is_active": True,
+    }
+    values = [known.get(field.attname, DEFERRED) for field in CustomUser._meta.concrete_fields]
+    user = CustomUser.from_db("default", None, values)
+
+    if claims.get("customer_profile_id") is not None:
+        customer = Customer.from_db(
+            "default", None,
+            [{"id": claims["customer_profile_id"], "user_id": user_id}.get(field.attname, DEFERRED)
+             for field in Customer._meta.concrete_fields],
+        )
+        customer.user = user
+        CustomUser.customer_profile.related.set_cached_value(user, customer)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        # Tokens issued before the claims were added fall back to loading the user
+        if "role" not in validated_token:
+            return super().get_user(validated_token)
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        state = _account_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        is_active, role, is_staff = state
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if (role, is_staff) != (validated_token["role"], validated_token.get("is_staff", False)):
+            raise AuthenticationFailed(_("Token is out of date, please sign in again"), code="token_claims_stale")
+
+        return _lightweight_user(user_id, validated_token)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Adds the claims ClaimsJWTAuthentication needs; refreshed access tokens inherit them."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["role"] = user.role
+        token["is_staff"] = user.is_staff
+        customer_profile = Customer.objects.filter(user=user).values_list("id", flat=True).first()
+        token["customer_profile_id"] = customer_profile
+        return token
@@ -1,4 +1,7 @@
 import django_filters
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Lower
 from .models import CustomUser
 
 class UserFilter(django_filters.FilterSet):
@@ -6,7 +9,27 @@ class UserFilter(django_filters.FilterSet):
     username = django_filters.CharFilter(lookup_expr='icontains')  # Case-insensitive contains
     role = django_filters.CharFilter()  # Exact match
     is_verified = django_filters.BooleanFilter()  # Boolean filter for true/false
+    search = django_filters.CharFilter(method='filter_search')  # Email or username, see filter_search
 
     class Meta:
         model = CustomUser
-        fields = ['email', 'username', 'role', 'is_verified']
\ No newline at end of file
+        fields = ['email', 'username', 'role', 'is_verified']
+
+    def filter_search(self, queryset, name, value):
+        """
+        Users whose email or username contains `value` on Postgres, where trigram
+        indexes serve substring matches. Other databases only have B-tree indexes,
+        so there it matches emails and usernames that start with `value`.
+        """
+        value = value.strip()
+        if not value:
+            return queryset
+        if connections[queryset.db].vendor == "postgresql":
+            return queryset.filter(Q(email__icontains=value) | Q(username__icontains=value))
+
+        # lower(col) >= prefix AND lower(col) < prefix with its last character bumped
+        prefix = value.lower()
+        end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return queryset.alias(email_lower=Lower('email'), username_lower=Lower('username')).filter(
+            Q(email_lower__gte=prefix, email_lower__lt=end) | Q(username_lower__gte=prefix, username_lower__lt=end)
+        )
@@ -1,12 +1,50 @@
 import random
 import string
+
+from django.db import IntegrityError, transaction
+
 from .models import AcessCode
 
-def generate_unique_code():
-    """Generate a unique 10-character code associated with a specific role."""
-    while True:
-        # Generate a random alphanumeric string of length 10
-        random_code = ''.join(random.choices(string.ascii_letters + string.digits, k=10))
+CODE_ALPHABET = string.ascii_letters + string.digits
+CODE_LENGTH = 10
+MAX_COLLISION_RETRIES = 5
+
+
+def _random_code():
+    return ''.join(random.choices(CODE_ALPHABET, k=CODE_LENGTH))
+
+
+def create_access_codes(counts):
+    """
+    Create `counts[role]` access codes for each role with a single bulk_create.
+
+    Codes are drawn in memory, distinct within the batch. The unique constraint on
+    AcessCode.code catches the rare clash with an existing code; only then are the
+    clashing codes looked up, redrawn and the insert retried. Returns the new codes.
+    """
+    codes = set()
+    batch = []
+    for role, count in counts.items():
+        for _ in range(count):
+            code = _random_code()
+            while code in codes:
+                code = _random_code()
+            codes.add(code)
+            batch.append(AcessCode(code=code, role=role))
 
-        if not AcessCode.objects.filter(code=random_code).exists():
-            return random_code
+    for _ in range(MAX_COLLISION_RETRIES):
+        try:
+            with transaction.atomic():
+                return AcessCode.objects.bulk_create(batch)
+        except IntegrityError:
+            taken = set(AcessCode.objects.filter(code__in=codes).values_list('code', flat=True))
+            if not taken:
+                raise
+            for access_code in batch:
+                if access_code.code in taken:
+                    code = _random_code()
+                    while code in codes or code in taken:
+                        code = _random_code()
+                    codes.add(code)
+                    access_code.code = code
+    raise IntegrityError("Could not draw unique access codes.")
@@ -0,0 +1,149 @@
+"""
+Importing supplier and customer accounts from CSV or JSON lines files.
+
+Rows are read lazily and handled in chunks: each chunk is checked against the rows
+seen so far plus one lookup of existing emails and usernames, its passwords are
+hashed across processes (hashing dominates the cost of creating an account), and its
+users, profiles and ranks are written with provision_profiles(). A chunk is one
+transaction, so an interrupted import can simply be re-run: imported rows are skipped.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+
+from users.models import CustomUser, Customer, Supplier
+from users.provisioning import provision_profiles
+
+PROFILE_FIELDS = {
+    "customer": (Customer, ["phone_number"]),
+    "supplier": (Supplier, ["company_name", "phone_number"]),
+}
+USER_FIELDS = ["first_name", "last_name"]
+
+
+def read_rows(path, file_format=None):
+    """Yield (line number, row) from a CSV file with a header row or a JSON lines file."""
+    if file_format is None:
+        file_format = "jsonl" if str(path).endswith((".jsonl", ".ndjson")) else "csv"
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield line_number, row
+
+
+def _value(row, field):
+    return str(row.get(field) or "").strip()
+
+
+def _email(row):
+    return CustomUser.objects.normalize_email(_value(row, "email"))
+
+
+def _build(row, role, taken_emails, taken_usernames):
+    """An unsaved (user, profile, password) for `row`, or why it is skipped."""
+    if not isinstance(row, dict):
+        return "not a JSON object"
+    email = _email(row)
+    username = _value(row, "username") or None
+    if not email:
+        return "email is missing"
+    if email in taken_emails:
+        return f"email {email} already exists"
+    if username in taken_usernames:
+        return f"username {username} already exists"
+    profile_model, profile_fields = PROFILE_FIELDS[role]
+    missing = [field for field in profile_fields if not _value(row, field)]
+    if missing:
+        return f"{', '.join(missing)} missing"
+
+    user = CustomUser(
+        email=email, username=username, role=role, is_verified=True,
+        **{field: _value(row, field) for field in USER_FIELDS},
+    )
+    profile = profile_model(**{field: _value(row, field) for field in profile_fields})
+    # bulk_create does not validate: an over-long value or a malformed email would
+    # abort the whole chunk
+    try:
+        user.clean_fields(exclude=["password"])
+        profile.clean_fields(exclude=["user"])
+    except ValidationError as error:
+        return "; ".join(f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items())
+
+    taken_emails.add(email)
+    if username is not None:
+        taken_usernames.add(username)
+    # Without a password the account gets an unusable one until it is reset
+    return user, profile, row.get("password") or None
+
+
+def import_users(rows, role, chunk_size=1000, workers=None, dry_run=False):
+    """
+    Create a `role` ("customer" or "supplier") account for each (line, row) of
+    `rows`. Rows with a missing or invalid field, or whose email or username is
+    taken, are skipped. Passwords are hashed by `workers` processes (default: one per CPU;
+    1 hashes in this process).
+
+    Returns {"created": count, "skipped": [(line, reason), ...]}.
+    """
+    if role not in PROFILE_FIELDS:
+        raise ValueError(f"Cannot import users with role '{role}'.")
+    workers = workers or os.cpu_count() or 1
+
+    created = 0
+    skipped = []
+    taken_emails, taken_usernames = set(), set()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and not dry_run else None
+    rows = iter(rows)
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            valid = [row for _, row in chunk if isinstance(row, dict)]
+            taken_emails.update(
+                CustomUser.objects.filter(email__in=[_email(row) for row in valid]).values_list("email", flat=True)
+            )
+            taken_usernames.update(
+                CustomUser.objects.filter(username__in=[_value(row, "username") for row in valid])
+                .values_list("username", flat=True)
+            )
+
+            accounts = []
+            for line, row in chunk:
+                account = _build(row, role, taken_emails, taken_usernames)
+                if isinstance(account, str):
+                    skipped.append((line, account))
+                else:
+                    accounts.append(account)
+            if dry_run or not accounts:
+                created += len(accounts)
+                continue
+
+            passwords = [password for _, _, password in accounts]
+            if executor is None:
+                hashes = map(make_password, passwords)
+            else:
+                hashes = executor.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4)))
+            users = []
+            for (user, _, _), password_hash in zip(accounts, hashes):
+                user.password = password_hash
+                users.append(user)
+
+            provision_profiles(users, [profile for _, profile, _ in accounts])
+            created += len(accounts)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return {"created": created, "skipped": skipped}
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.functions import create_access_codes
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Generate access codes in bulk, e.g. `generate_access_codes customer=200 staff=10`. Prints one 'role code' per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument("counts", nargs="+", metavar="role=count", help="How many codes to generate for a role.")
+
+    def handle(self, *args, **options):
+        roles = dict(CustomUser.ROLE_CHOICES)
+        counts = {}
+        for pair in options["counts"]:
+            role, _, count = pair.partition("=")
+            if role not in roles:
+                raise CommandError(f"Unknown role '{role}'. Choose from: {', '.join(roles)}.")
+            if not count.isdigit() or int(count) < 1:
+                raise CommandError(f"Invalid count in '{pair}'.")
+            counts[role] = counts.get(role, 0) + int(count)
+
+        access_codes = create_access_codes(counts)
+        for access_code in access_codes:
+            self.stdout.write(f"{access_code.role} {access_code.code}")
+        self.stderr.write(self.style.SUCCESS(f"Generated {len(access_codes)} access codes."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importing import PROFILE_FIELDS, import_users, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import customer or supplier accounts from a CSV (with a header row) or JSON lines file. "
+        "Columns: email, username, first_name, last_name, password, phone_number and, for suppliers, company_name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--role", required=True, choices=sorted(PROFILE_FIELDS), help="Role of the imported accounts.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="File format (default: from the file extension).")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Accounts hashed and written per transaction.")
+        parser.add_argument("--workers", type=int, help="Processes hashing passwords (default: one per CPU).")
+        parser.add_argument("--dry-run", action="store_true", help="Only check the rows; create nothing.")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        try:
+            result = import_users(
+                read_rows(options["path"], options["format"]),
+                options["role"],
+                chunk_size=options["chunk_size"],
+                workers=options["workers"],
+                dry_run=options["dry_run"],
+            )
+        except OSError as error:
+            raise CommandError(f"Cannot read '{options['path']}': {error}.")
+
+        for line, reason in result["skipped"]:
+            self.stderr.write(f"Line {line} skipped: {reason}.")
+        verb = "Would import" if options["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['created']} {options['role']} accounts, skipped {len(result['skipped'])} rows."
+        ))
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-18 18:13
+
+import random
+import string
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def redraw_duplicate_codes(apps, schema_editor):
+    # A duplicated code could not be redeemed (the lookup matched several rows); keep
+    # the first row of each and give the others fresh codes so the constraint applies.
+    AcessCode = apps.get_model("users", "AcessCode")
+    duplicated = (
+        AcessCode.objects.values("code").annotate(rows=Count("id")).filter(rows__gt=1).values_list("code", flat=True)
+    )
+    taken = set(AcessCode.objects.values_list("code", flat=True))
+    for code in list(duplicated):
+        for access_code in AcessCode.objects.filter(code=code).order_by("id")[1:]:
+            new_code = code
+            while new_code in taken:
+                new_code = "".join(random.choices(string.ascii_letters + string.digits, k=10))
+            taken.add(new_code)
+            access_code.code = new_code
+            access_code.save(update_fields=["code"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_remove_customer_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(redraw_duplicate_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='acesscode',
+            name='code',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+RANKS = ["bronze", "silver", "gold", "platinum"]
+
+
+def seed_ranks(apps, schema_editor):
+    # Profiles are created with the default rank's id, so the ranks must exist up front
+    UserRank = apps.get_model("users", "UserRank")
+    for rank in RANKS:
+        UserRank.objects.get_or_create(rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_acesscode_code_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_ranks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.2 on 2026-10-18 18:17
+
+from django.db import migrations, models
+
+SEARCH_COLUMNS = ["email", "username"]
+
+
+def create_search_indexes(apps, schema_editor):
+    # Postgres: trigram GIN indexes on the expression icontains compiles to
+    # (UPPER(col::text) LIKE ...), so substring search is indexed. Elsewhere the
+    # search is a prefix range on lower(col), served by an expression B-tree.
+    postgres = schema_editor.connection.vendor == "postgresql"
+    if postgres:
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in SEARCH_COLUMNS:
+        if postgres:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS "users_customuser_{column}_trgm_idx" '
+                f'ON "users_customuser" USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+            )
+        else:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS "users_customuser_{column}_lower_idx" ON "users_customuser" (LOWER("{column}"))'
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "users_customuser_{column}_trgm_idx"')
+        schema_editor.execute(f'DROP INDEX IF EXISTS "users_customuser_{column}_lower_idx"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0010_seed_user_ranks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', 'is_verified'], name='users_custo_role_10db6c_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
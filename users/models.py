@@ -15,6 +15,26 @@ class UserRank(models.Model):
     def __str__(self):
         return self.rank
 
+
+DEFAULT_RANK = "bronze"
+_default_rank_id = None
+
+
+def default_rank_id():
+    """
+    Id of the rank new suppliers and customers get, looked up once per process. The
+    rank cannot be deleted (see users.signals), so the cached id stays valid.
+    """
+    global _default_rank_id
+    if _default_rank_id is None:
+        _default_rank_id = UserRank.objects.get_or_create(rank=DEFAULT_RANK)[0].pk
+    return _default_rank_id
+
+
+def forget_default_rank():
+    global _default_rank_id
+    _default_rank_id = None
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         """
@@ -73,6 +93,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     
     class Meta:
         verbose_name = "User"
+        indexes = [models.Index(fields=["role", "is_verified"])]
     
     
 class Supplier(models.Model):
@@ -84,11 +105,12 @@ class Supplier(models.Model):
         return f"{self.user.username}|{self.id}"
     
     def save(self, *args, **kwargs):
+        creating = self._state.adding
         super().save(*args, **kwargs)
-    
-        if not self.rank.exists():
-            bronze_rank, created = UserRank.objects.get_or_create(rank="bronze")
-            self.rank.add(bronze_rank)
+
+        # New profiles start at the default rank; later saves leave the ranks alone
+        if creating:
+            Supplier.rank.through.objects.create(supplier=self, userrank_id=default_rank_id())
     
     
     
@@ -101,11 +123,12 @@ class Customer(models.Model):
         return f"{self.user.username}|{self.id}"
     
     def save(self, *args, **kwargs):
+        creating = self._state.adding
         super().save(*args, **kwargs)
-    
-        if not self.rank.exists():
-            bronze_rank, created = UserRank.objects.get_or_create(rank="bronze")
-            self.rank.add(bronze_rank)
+
+        # New profiles start at the default rank; later saves leave the ranks alone
+        if creating:
+            Customer.rank.through.objects.create(customer=self, userrank_id=default_rank_id())
     
 class Address(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='address')
@@ -120,7 +143,7 @@ class Address(models.Model):
     
 class AcessCode(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
-    code = models.CharField(max_length=50)
+    code = models.CharField(max_length=50, unique=True)
     role = models.CharField(max_length=20, choices=CustomUser.ROLE_CHOICES)
     
     def __str__(self):
@@ -0,0 +1,59 @@
+"""
+Bulk provisioning of supplier and customer accounts.
+
+Registration creates one account at a time through the serializers. Importing
+thousands of them that way costs several queries each; provision_profiles() inserts
+the users, their profiles and the profiles' default rank rows with one bulk_create
+per table and batch instead. Model save() and post_save signals do not run.
+"""
+from django.db import transaction
+
+from users.models import CustomUser, default_rank_id
+
+BATCH_SIZE = 500
+
+
+def provision_profiles(users, profiles, batch_size=BATCH_SIZE):
+    """
+    Create `users` (unsaved CustomUser instances, passwords already set) and
+    `profiles` (unsaved Supplier or Customer instances, one per user in the same
+    order; their `user` is filled in here). Every profile gets the default rank.
+
+    Runs in one transaction, so either all accounts are created or none. Returns the
+    created users.
+    """
+    if len(users) != len(profiles):
+        raise ValueError("Give exactly one profile per user.")
+    if not users:
+        return []
+
+    profile_model = type(profiles[0])
+    through = profile_model.rank.through
+    source = profile_model.rank.field.m2m_field_name()
+    target = profile_model.rank.field.m2m_reverse_field_name()
+    rank_id = default_rank_id()
+
+    with transaction.atomic():
+        for start in range(0, len(users), batch_size):
+            user_batch = CustomUser.objects.bulk_create(users[start:start + batch_size])
+            if user_batch[0].pk is None:
+                # Backends that cannot return ids from a bulk insert: look them up once
+                ids = dict(
+                    CustomUser.objects.filter(email__in=[user.email for user in user_batch]).values_list("email", "id")
+                )
+                for user in user_batch:
+                    user.pk = ids[user.email]
+
+            profile_batch = profiles[start:start + batch_size]
+            for user, profile in zip(user_batch, profile_batch):
+                profile.user = user
+            profile_model.objects.bulk_create(profile_batch)
+            if profile_batch[0].pk is None:
+                ids = dict(profile_model.objects.filter(user__in=user_batch).values_list("user_id", "id"))
+                for profile in profile_batch:
+                    profile.pk = ids[profile.user_id]
+
+            through.objects.bulk_create(
+                [through(**{f"{source}_id": profile.pk, f"{target}_id": rank_id}) for profile in profile_batch]
+            )
+    return users
@@ -0,0 +1,18 @@
+from django.db.models import ProtectedError
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+from users.models import DEFAULT_RANK, CustomUser, UserRank
+from users.authentication import forget_user
+
+
+# Deactivations and role changes take effect in this process at once, elsewhere within JWT_USER_STATE_TTL
+@receiver(post_save, sender=CustomUser)
+def forget_cached_account_state(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+# Every process caches the default rank's id (default_rank_id), so it must not go away
+@receiver(pre_delete, sender=UserRank)
+def protect_default_rank(sender, instance, **kwargs):
+    if instance.rank == DEFAULT_RANK:
+        raise ProtectedError(f"The default rank '{DEFAULT_RANK}' cannot be deleted.", {instance})
@@ -1,6 +1,21 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth import get_user_model
-from users.models import Supplier, Customer, UserRank, Address, AcessCode
+from django.db import connection, transaction
+from django.db.models import ProtectedError
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from users.models import Supplier, Customer, UserRank, Address, AcessCode, default_rank_id, forget_default_rank
+from users.authentication import forget_user
+from users.functions import create_access_codes
+from users.provisioning import provision_profiles
 
 CustomUser = get_user_model()
 
@@ -92,6 +107,134 @@ class CustomerModelTest(TestCase):
         self.assertTrue(customer.rank.filter(rank="bronze").exists())
 
 
+class ProfileProvisioningTest(TestCase):
+    def make_users(self, count, role):
+        users = []
+        for number in range(count):
+            user = CustomUser(email=f"{role}{number}@example.com", username=f"{role}{number}", role=role, is_verified=True)
+            user.set_unusable_password()
+            users.append(user)
+        return users
+
+    def test_profile_edits_do_not_touch_ranks(self):
+        user = self.make_users(1, "customer")[0]
+        user.save()
+        customer = Customer.objects.create(user=user, phone_number="1")
+        customer.phone_number = "2"
+        with CaptureQueriesContext(connection) as context:
+            customer.save()
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(list(customer.rank.values_list("rank", flat=True)), ["bronze"])
+
+    def test_the_default_rank_is_looked_up_once_per_process(self):
+        first, second = self.make_users(2, "supplier")
+        first.save()
+        second.save()
+        forget_default_rank()
+        with self.assertNumQueries(3):
+            Supplier.objects.create(user=first, company_name="Acme", phone_number="1")
+        with self.assertNumQueries(2):
+            Supplier.objects.create(user=second, company_name="Acme", phone_number="2")
+
+    def test_the_default_rank_cannot_be_deleted(self):
+        with self.assertRaises(ProtectedError), transaction.atomic():
+            UserRank.objects.get(rank="bronze").delete()
+        with self.assertRaises(ProtectedError), transaction.atomic():
+            UserRank.objects.filter(rank__in=["bronze", "gold"]).delete()
+        self.assertTrue(UserRank.objects.filter(pk=default_rank_id()).exists())
+        UserRank.objects.filter(rank="gold").delete()
+
+    def test_bulk_provisioning(self):
+        users = self.make_users(120, "customer")
+        profiles = [Customer(phone_number=str(number)) for number in range(120)]
+        with CaptureQueriesContext(connection) as context:
+            provision_profiles(users, profiles, batch_size=50)
+        inserts = [query for query in context.captured_queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 9)  # Users, profiles and rank rows for three batches
+        self.assertEqual(Customer.objects.count(), 120)
+        self.assertEqual(UserRank.objects.get(rank="bronze").customers_with_rank.count(), 120)
+        self.assertEqual(Customer.objects.get(phone_number="7").user.email, "customer7@example.com")
+
+    def test_bulk_provisioning_suppliers(self):
+        users = self.make_users(3, "supplier")
+        provision_profiles(users, [Supplier(company_name=f"Company {number}", phone_number="1") for number in range(3)])
+        self.assertEqual(Supplier.objects.filter(rank__rank="bronze").count(), 3)
+
+
+class ImportUsersCommandTest(TestCase):
+    def write(self, name, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, "w", newline="", encoding="utf-8") as target:
+            target.write(content)
+        return path
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_users", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_creates_users_profiles_and_ranks(self):
+        CustomUser.objects.create_user(email="taken@example.com", username="taken", password="x")
+        path = self.write("customers.csv", (
+            "email,username,first_name,password,phone_number\n"
+            "abebe@example.com,abebe,Abebe,secret-1,0911\n"
+            "taken@example.com,other,,secret-2,0912\n"
+            "noPhone@example.com,nophone,,secret-3,\n"
+            "kebede@example.com,,Kebede,,0913\n"
+            "abebe@example.com,abebe2,,secret-4,0914\n"
+        ))
+        out, err = self.run_import(path, "--role", "customer", "--workers", "1", "--chunk-size", "2")
+
+        self.assertIn("Imported 2 customer accounts, skipped 3 rows", out)
+        self.assertIn("Line 3 skipped: email taken@example.com already exists", err)
+        self.assertIn("Line 4 skipped: phone_number missing", err)
+        self.assertIn("Line 6 skipped: email abebe@example.com already exists", err)
+        abebe = CustomUser.objects.get(email="abebe@example.com")
+        self.assertTrue(abebe.check_password("secret-1"))
+        self.assertEqual((abebe.role, abebe.first_name, abebe.customer_profile.phone_number), ("customer", "Abebe", "0911"))
+        self.assertEqual(list(abebe.customer_profile.rank.values_list("rank", flat=True)), ["bronze"])
+        self.assertFalse(CustomUser.objects.get(email="kebede@example.com").has_usable_password())
+
+    def test_jsonl_import_hashes_in_worker_processes(self):
+        rows = [
+            {"email": f"supplier{number}@example.com", "company_name": f"Company {number}",
+             "phone_number": "1", "password": f"pass-{number}"}
+            for number in range(3)
+        ]
+        path = self.write("suppliers.jsonl", "\n".join(json.dumps(row) for row in rows) + "\nnot json\n")
+        out, err = self.run_import(path, "--role", "supplier", "--workers", "2")
+
+        self.assertIn("Imported 3 supplier accounts, skipped 1 rows", out)
+        self.assertIn("Line 4 skipped: not a JSON object", err)
+        supplier = CustomUser.objects.get(email="supplier2@example.com")
+        self.assertTrue(supplier.check_password("pass-2"))
+        self.assertEqual(supplier.supplier_profile.company_name, "Company 2")
+
+    def test_invalid_values_are_skipped(self):
+        path = self.write("customers.csv", (
+            "email,first_name,phone_number\n"
+            "not-an-email,,0911\n"
+            f"long@example.com,{'A' * 31},0912\n"
+            "phone@example.com,,0913091309130913\n"
+            "valid@example.com,Abebe,0914\n"
+        ))
+        out, err = self.run_import(path, "--role", "customer", "--workers", "1")
+
+        self.assertIn("Imported 1 customer accounts, skipped 3 rows", out)
+        self.assertIn("Line 2 skipped: email: Enter a valid email address.", err)
+        self.assertIn("Line 3 skipped: first_name: Ensure this value has at most 30 characters (it has 31).", err)
+        self.assertIn("Line 4 skipped: phone_number: Ensure this value has at most 15 characters (it has 16).", err)
+        self.assertEqual(list(CustomUser.objects.values_list("email", flat=True)), ["valid@example.com"])
+
+    def test_dry_run_creates_nothing(self):
+        path = self.write("customers.csv", "email,phone_number\na@example.com,1\n")
+        out, _ = self.run_import(path, "--role", "customer", "--dry-run")
+        self.assertIn("Would import 1 customer accounts", out)
+        self.assertFalse(CustomUser.objects.exists())
+
+
 class AddressModelTest(TestCase):
     def setUp(self):
         # Create a user and associate an address with the user
@@ -122,3 +265,120 @@ class AcessCodeModelTest(TestCase):
         )
         self.assertEqual(access_code.code, "XYZ123")
         self.assertEqual(access_code.role, "customer")
+
+
+class AccessCodeBatchTest(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(email="admin@example.com", username="admin", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_batch_endpoint_creates_codes_in_one_insert(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse("access_code_batch_create"), {"counts": {"customer": 50, "staff": 5}}, format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 55)
+        self.assertEqual(AcessCode.objects.filter(role="customer").count(), 50)
+        self.assertEqual(AcessCode.objects.values("code").distinct().count(), 55)
+        inserts = [query for query in context.captured_queries if query["sql"].startswith('INSERT INTO "users_acesscode"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertFalse([query for query in context.captured_queries if '"users_acesscode"' in query["sql"] and query["sql"].startswith("SELECT")])
+
+    def test_batch_endpoint_rejects_unknown_roles(self):
+        response = self.client.post(reverse("access_code_batch_create"), {"counts": {"janitor": 3}}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AcessCode.objects.exists())
+
+    def test_collisions_with_existing_codes_are_redrawn(self):
+        AcessCode.objects.create(code="TAKEN00000", role="staff")
+        draws = iter(["TAKEN00000", "FRESH00001", "FRESH00002"])
+        with mock.patch("users.functions._random_code", side_effect=lambda: next(draws)):
+            created = create_access_codes({"customer": 2})
+        self.assertEqual(sorted(code.code for code in created), ["FRESH00001", "FRESH00002"])
+        self.assertEqual(AcessCode.objects.count(), 3)
+
+    def test_single_code_creation_still_works(self):
+        response = self.client.post(reverse("access_code_list_create"), {"role": "supplier"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["code"]), 10)
+
+    def test_command_prints_codes(self):
+        out = StringIO()
+        call_command("generate_access_codes", "supplier=3", "customer=2", stdout=out, stderr=StringIO())
+        lines = out.getvalue().split()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(AcessCode.objects.filter(role="supplier").count(), 3)
+
+
+class UserSearchTest(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(email="admin@example.com", username="admin", password="password123")
+        CustomUser.objects.create_user(email="Abebe.Kebede@example.com", username="abebe", password="x", role="customer", is_verified=True)
+        CustomUser.objects.create_user(email="hana@example.com", username="AbelT", password="x", role="supplier")
+        CustomUser.objects.create_user(email="tsion@example.com", username="tsion", password="x", role="customer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, **params):
+        response = self.client.get(reverse("user-details"), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(user["email"] for user in response.data["results"])
+
+    def test_search_matches_email_or_username_prefix_case_insensitively(self):
+        self.assertEqual(self.search(search="abe"), ["Abebe.Kebede@example.com", "hana@example.com"])
+        self.assertEqual(self.search(search="TSION"), ["tsion@example.com"])
+        self.assertEqual(self.search(search="  "), sorted(CustomUser.objects.values_list("email", flat=True)))
+
+    def test_search_combines_with_role_filters(self):
+        self.assertEqual(self.search(search="abe", role="customer", is_verified="true"), ["Abebe.Kebede@example.com"])
+
+
+class ClaimsJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="customer@example.com", username="customer", password="password123", role="customer"
+        )
+        self.customer = Customer.objects.create(user=self.user, phone_number="0")
+        self.client = APIClient()
+        response = self.client.post(
+            reverse("token_obtain_pair"), {"email": "customer@example.com", "password": "password123"}, format="json"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        forget_user(self.user.pk)
+
+    def user_queries(self, context):
+        return [query for query in context.captured_queries if '"users_customuser"' in query["sql"]]
+
+    def test_requests_are_authenticated_from_claims(self):
+        url = reverse("sales-order-list")
+        self.client.get(url)  # Caches the account state
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_queries(context), [])
+
+    def test_request_user_carries_role_and_profile(self):
+        request = self.client.get(reverse("sales-order-list")).wsgi_request
+        user = request.user
+        self.assertEqual((user.pk, user.role, user.username), (self.user.pk, "customer", "customer"))
+        with self.assertNumQueries(0):
+            self.assertEqual(user.customer_profile.pk, self.customer.pk)
+
+    def test_username_is_read_from_the_account(self):
+        self.user.username = "renamed"
+        self.user.save()
+        request = self.client.get(reverse("sales-order-list")).wsgi_request
+        self.assertEqual(request.user.username, "renamed")
+
+    def test_deactivated_user_is_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("sales-order-list")).status_code, 401)
+
+    def test_role_change_invalidates_token(self):
+        self.user.role = "staff"
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("sales-order-list")).status_code, 401)
@@ -27,7 +27,7 @@ class WarehouseProductsView(generics.ListAPIView):
     def get(self, request, pk, *args, **kwargs):
         warehouse = get_object_or_404(Warehouse, pk=pk)
         # Fetch all the products in this warehouse
-        warehouse_stocks = WarehouseStock.objects.filter(warehouse=warehouse)
+        warehouse_stocks = WarehouseStock.objects.filter(warehouse=warehouse).select_related("product__stock_summary").prefetch_related("product__images")
         # Check if there are products in the warehouse
         if not warehouse_stocks.exists():
             return Response({"message": "There are no products in this warehouse."}, status=status.HTTP_200_OK)